@@ -5,3 +5,5 @@ class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
 
+    def ready(self):
+        import api.signals  # Token cache invalidation
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_saved_user(sender, instance, created, **kwargs):
+    # Covers deactivation and password changes
+    if created:
+        return
+    token_cache.invalidate_user(instance.pk)
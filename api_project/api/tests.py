@@ -1,3 +1,30 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .authentication import token_cache
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', password='x', is_staff=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        token_cache.local.clear()
+
+    def test_unavailable_cache_falls_back_to_the_database(self):
+        broken = mock.Mock(**{
+            f'{name}.side_effect': ConnectionError('cache down')
+            for name in ('get', 'set', 'delete')
+        })
+        with mock.patch('api.authentication.cache', broken), self.assertLogs('api.authentication', 'WARNING'):
+            self.assertEqual(self.client.get('/api/auth-token/stats/').status_code, 200)
+            token_cache.local.clear()
+            self.assertEqual(self.client.get('/api/auth-token/stats/').status_code, 200)
 
-# Create your tests here.
+            self.user.is_active = False
+            self.user.save()
+            self.assertEqual(self.client.get('/api/auth-token/stats/').status_code, 401)
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token # Import token view
-from .views import BookList, BookViewSet
+from .views import BookList, BookViewSet, token_cache_stats
 
 # Initialize the router
 router = DefaultRouter()
@@ -14,4 +14,5 @@ urlpatterns = [
     # Include the router URLs for BookViewSet (all CRUD operations)
     path('', include(router.urls)),  # This includes all routes registered with the router
     path('auth-token/', obtain_auth_token, name='api_token_auth'),  # Token obtain endpoint
+    path('auth-token/stats/', token_cache_stats, name='api_token_cache_stats'),  # Token cache hit rate (staff only)
 ]
\ No newline at end of file
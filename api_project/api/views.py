@@ -1,7 +1,10 @@
 from django.shortcuts import render
 
 # Create your views here.
-from rest_framework import generics, viewsets
+from rest_framework import generics, permissions, viewsets
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from .authentication import token_cache
 from .models import Book
 from .serializers import BookSerializer
 
@@ -19,4 +22,12 @@ class BookViewSet(viewsets.ModelViewSet):
     `partial_update()`, `destroy()` and `list()` actions for Book model.
     """
     queryset = Book.objects.all()
-    serializer_class = BookSerializer
\ No newline at end of file
+    serializer_class = BookSerializer
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def token_cache_stats(request):
+    """
+    Hit rate of this process's token authentication cache.
+    """
+    return Response(token_cache.snapshot())
@@ -59,7 +59,7 @@ REST_FRAMEWORK = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Token auth
+        'api.authentication.CachedTokenAuthentication',  # Token auth, cached per token
         'rest_framework.authentication.SessionAuthentication',  # Session auth for browsable API
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -111,6 +111,20 @@ DATABASES = {
 }
 
 
+# Cache
+# The default per-process cache is enough for one process. When several
+# run, point CACHES at a shared backend so a token dropped by one process
+# (deleted, or its user deactivated) is dropped for all of them, e.g.
+# (needs the redis package):
+#
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#         'LOCATION': 'redis://127.0.0.1:6379/2',
+#     }
+# }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -151,3 +165,8 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Token authentication cache (api.authentication)
+AUTH_TOKEN_CACHE_TTL = 300  # Seconds an entry lives in the shared cache
+AUTH_TOKEN_LOCAL_TTL = 30  # Seconds an entry lives in each process's LRU; bounds how long a revoked token keeps working elsewhere
+AUTH_TOKEN_LOCAL_SIZE = 10000  # Tokens kept in each process's LRU
@@ -0,0 +1,147 @@
+"""
+TokenAuthentication with the token -> user lookup cached, so a request
+does not start with a Token + user query. A small per-process LRU with a
+short TTL sits in front of the shared Django cache (Redis in production,
+see CACHES); both are dropped when a token is deleted or its user is saved
+(deactivated, password changed). The shared entry goes at once, so
+another process stops using a revoked token within AUTH_TOKEN_LOCAL_TTL
+seconds, once its LRU entry expires.
+
+The shared cache is only a shortcut: when its backend fails, lookups go
+to the database as TokenAuthentication does, so requests never fail on it.
+
+The cached user leaves out UNCACHED_FIELDS: columns moved with
+QuerySet.update(), which sends no post_save and so never invalidates the
+cache. They are loaded from the database when first read.
+"""
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+logger = logging.getLogger(__name__)
+
+# Follow counters, adjusted with F() updates by CustomUser.follow()
+UNCACHED_FIELDS = ('follower_count', 'following_count')
+
+
+def local_ttl():
+    return getattr(settings, 'AUTH_TOKEN_LOCAL_TTL', 30)
+
+
+def shared_ttl():
+    return getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 300)
+
+
+def local_size():
+    return getattr(settings, 'AUTH_TOKEN_LOCAL_SIZE', 10000)
+
+
+class TokenUserCache:
+    """Two-level token -> user cache with hit counters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = OrderedDict()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def cache_key(self, key):
+        # Keep raw tokens out of the shared cache
+        return 'auth_token:' + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """A private copy of the cached user for this token, or None"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.local.get(key)
+            if entry is not None and entry[0] > now:
+                self.local.move_to_end(key)
+                self.local_hits += 1
+                return copy.copy(entry[1])
+
+        try:
+            user = cache.get(self.cache_key(key))
+        except Exception:
+            logger.warning('Token cache unavailable, reading the database', exc_info=True)
+            user = None
+        with self.lock:
+            if user is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self.remember(key, user)
+        return copy.copy(user)
+
+    def set(self, key, user):
+        user = self.cacheable(user)
+        try:
+            cache.set(self.cache_key(key), user, shared_ttl())
+        except Exception:
+            logger.warning('Could not cache the token user', exc_info=True)
+        self.remember(key, user)
+
+    def cacheable(self, user):
+        """A copy of user without UNCACHED_FIELDS, which then load on access"""
+        user = copy.copy(user)
+        for field in UNCACHED_FIELDS:
+            user.__dict__.pop(field, None)
+        return user
+
+    def remember(self, key, user):
+        with self.lock:
+            self.local[key] = (time.monotonic() + local_ttl(), user)
+            self.local.move_to_end(key)
+            while len(self.local) > local_size():
+                self.local.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.local.pop(key, None)
+        try:
+            cache.delete(self.cache_key(key))
+        except Exception:
+            # The shared entry then lives until AUTH_TOKEN_CACHE_TTL runs out
+            logger.warning('Could not drop a cached token user', exc_info=True)
+
+    def invalidate_user(self, user_id):
+        for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+            self.invalidate(key)
+
+    def snapshot(self):
+        with self.lock:
+            hits = self.local_hits + self.shared_hits
+            lookups = hits + self.misses
+            return {
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else None,
+                'local_entries': len(self.local),
+            }
+
+
+token_cache = TokenUserCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that serves repeat tokens from token_cache"""
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is not None:
+            token = Token(key=key, user_id=user.pk)
+            token.user = user
+            return user, token
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user)
+        return user, token
@@ -0,0 +1,18 @@
+"""
+Password hashing for process pools. Pool workers import this module to
+find their functions, and a worker started with spawn or forkserver does
+so before Django is set up, so it must not import models, directly or
+through other modules.
+"""
+import django
+from django.contrib.auth.hashers import make_password
+
+
+def setup_worker():
+    """Pool initializer: load the settings and app registry in the worker"""
+    django.setup()
+
+
+def hash_password(raw):
+    """make_password in a pool worker; a blank password becomes unusable"""
+    return make_password(raw or None)
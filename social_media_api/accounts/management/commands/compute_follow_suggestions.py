@@ -0,0 +1,36 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.suggestions import refresh_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Compute friends-of-friends follow suggestions for users whose follows changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recompute every user with followees instead of only stale users'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Processes used to rank users (default: CPU count)'
+        )
+        parser.add_argument(
+            '--top-k', type=int,
+            help='Suggestions kept per user (default: FOLLOW_SUGGESTIONS_TOP_K)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = refresh_suggestions(
+            full=options['full'],
+            workers=options['workers'] or 1,
+            count=options['top_k']
+        )
+        mode = 'all users' if options['full'] else 'stale users'
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed suggestions for {written} {mode} in {time.monotonic() - started:.1f}s'
+        ))
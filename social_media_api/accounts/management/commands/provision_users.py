@@ -0,0 +1,139 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from accounts.hashing import hash_password, setup_worker
+from accounts.models import CustomUser
+from accounts.stats import adjust_user_count
+
+FIELDS = ('username', 'email', 'first_name', 'last_name', 'bio')
+
+
+def read_accounts(path, fmt):
+    """Yield one dict per account from a CSV file with a header or a JSONL file"""
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create users and API tokens in bulk from a CSV or JSONL file of accounts '
+        '(username, password, email, first_name, last_name, bio)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header) or JSONL file of accounts')
+        parser.add_argument(
+            '--format', choices=['csv', 'jsonl'],
+            help='Input format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Accounts hashed and inserted per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Password hashing processes (default: CPU count)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Progress file used to resume (default: <path>.progress)'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore an existing checkpoint and start from the first account'
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist')
+        fmt = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+        chunk_size = options['chunk_size']
+        checkpoint = Path(options['checkpoint'] or f'{path}.progress')
+        self.workers = max(1, options['workers'] or 1)
+
+        done = 0
+        if checkpoint.exists() and not options['restart']:
+            done = int(checkpoint.read_text().strip() or 0)
+            self.stdout.write(f'Resuming after {done} accounts')
+
+        accounts = islice(read_accounts(path, fmt), done, None)
+        chunks = iter(lambda: list(islice(accounts, chunk_size)), [])
+        created = skipped = 0
+        started = time.monotonic()
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=setup_worker) as pool:
+            # Hash the next chunk while the current one is being inserted
+            pending = self.submit(pool, next(chunks, None), chunk_size)
+            while pending is not None:
+                rows, hashes = pending
+                pending = self.submit(pool, next(chunks, None), chunk_size)
+
+                added, ignored = self.insert(rows, list(hashes))
+                created += added
+                skipped += ignored
+                done += len(rows)
+                checkpoint.write_text(str(done))
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{done} read, {created} created, {skipped} skipped '
+                    f'({created / elapsed:.0f} users/s)'
+                )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} users and tokens, skipped {skipped}, '
+            f'in {elapsed:.1f}s ({created / elapsed if elapsed else 0:.0f} users/s)'
+        ))
+
+    def submit(self, pool, rows, chunk_size):
+        if rows is None:
+            return None
+        passwords = [row.get('password') for row in rows]
+        chunksize = max(1, chunk_size // (4 * self.workers))
+        return rows, pool.map(hash_password, passwords, chunksize=chunksize)
+
+    def insert(self, rows, hashes):
+        """
+        Insert one chunk of users and their tokens in a transaction.
+        Usernames that already exist are skipped, so a chunk interrupted
+        before its checkpoint was written can be replayed safely.
+        """
+        users = {}
+        for row, password in zip(rows, hashes):
+            username = (row.get('username') or '').strip()
+            if not username or username in users:
+                continue
+            fields = {field: (row.get(field) or '').strip() for field in FIELDS}
+            users[username] = CustomUser(**{**fields, 'username': username, 'password': password})
+
+        with transaction.atomic():
+            existing = set(
+                CustomUser.objects.filter(username__in=list(users))
+                .values_list('username', flat=True)
+            )
+            new_users = [user for name, user in users.items() if name not in existing]
+            CustomUser.objects.bulk_create(new_users, batch_size=1000)
+            Token.objects.bulk_create(
+                [Token(key=Token.generate_key(), user_id=user.pk) for user in new_users],
+                batch_size=1000
+            )
+            # bulk_create sends no post_save, so move the user count here
+            transaction.on_commit(lambda: adjust_user_count(len(new_users)))
+
+        return len(new_users), len(rows) - len(new_users)
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in the denormalized follower_count and following_count columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of users checked per batch (default: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drift without writing corrections'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        checked = repaired = 0
+        last_id = 0
+
+        while True:
+            users = list(
+                CustomUser.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'follower_count', 'following_count')[:chunk_size]
+            )
+            if not users:
+                break
+            last_id = users[-1].id
+            checked += len(users)
+
+            user_ids = [user.id for user in users]
+            # In the followers table from_customuser is followed by to_customuser
+            follower_counts = self.count_by_user('from_customuser_id', user_ids)
+            following_counts = self.count_by_user('to_customuser_id', user_ids)
+
+            drifted = []
+            for user in users:
+                follower_count = follower_counts.get(user.id, 0)
+                following_count = following_counts.get(user.id, 0)
+                if (user.follower_count, user.following_count) != (follower_count, following_count):
+                    user.follower_count = follower_count
+                    user.following_count = following_count
+                    drifted.append(user)
+
+            repaired += len(drifted)
+            if drifted and not options['dry_run']:
+                CustomUser.objects.bulk_update(drifted, ['follower_count', 'following_count'])
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {repaired} drifted users out of {checked} checked'
+        ))
+
+    def count_by_user(self, column, user_ids):
+        rows = (
+            CustomUser.followers.through.objects.filter(**{f'{column}__in': user_ids})
+            .order_by()
+            .values(column)
+            .annotate(total=Count('id'))
+            .values_list(column, 'total')
+        )
+        return dict(rows)
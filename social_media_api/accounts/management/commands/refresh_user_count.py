@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts.stats import refresh_user_count
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cached total user count served by the accounts endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--estimate', action='store_true',
+            help='Use the planner row estimate instead of COUNT(*) where available'
+        )
+
+    def handle(self, *args, **options):
+        value = refresh_user_count(estimate=options['estimate'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Total users: {value}'))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:19
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_counts(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    Follow = CustomUser.followers.through
+
+    def count_of(column):
+        counts = (
+            Follow.objects.filter(**{column: OuterRef('pk')})
+            .order_by()
+            .values(column)
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return Coalesce(Subquery(counts), Value(0))
+
+    CustomUser.objects.update(
+        follower_count=count_of('from_customuser'),
+        following_count=count_of('to_customuser')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# Expression indexes for accounts.search.TrigramUserSearch. They only
+# exist on PostgreSQL; other databases use SimpleUserSearch without them.
+CREATE_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    # Prefix ranges and username order: UPPER(username) COLLATE "C"
+    'CREATE INDEX IF NOT EXISTS accounts_user_username_prefix_idx '
+    'ON accounts_customuser ((UPPER(username) COLLATE "C"))',
+    # Substring matches: username__icontains compiles to UPPER(username::text) LIKE
+    'CREATE INDEX IF NOT EXISTS accounts_user_username_trgm_idx '
+    'ON accounts_customuser USING gin ((UPPER(username::text)) gin_trgm_ops)',
+]
+
+DROP_SQL = [
+    'DROP INDEX IF EXISTS accounts_user_username_trgm_idx',
+    'DROP INDEX IF EXISTS accounts_user_username_prefix_idx',
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_follow_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(CREATE_SQL), run_on_postgresql(DROP_SQL)),
+    ]
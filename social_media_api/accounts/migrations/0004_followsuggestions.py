@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_username_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSuggestions',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_suggestions', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('suggestions', models.JSONField(blank=True, default=list)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('graph_changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
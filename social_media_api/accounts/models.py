@@ -2,59 +2,151 @@ from django.db import models
 
 # Create your models here.
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
 
 class CustomUser(AbstractUser):
     bio = models.TextField(max_length=500, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
-    followers = models.ManyToManyField('self', symmetrical=False, blank=True, related_name='following_set')
+    followers = models.ManyToManyField('self', symmetrical=False, blank=True, related_name='following')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Kept in step with the followers M2M by follow() and unfollow();
+    # reconcile_follow_counts repairs any drift
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return self.username
 
-    @property
-    def follower_count(self):
-        return self.followers.count()
-
-    @property
-    def following_count(self):
-        """Return users that this user is following"""
-        return self.following_set.count()
-
     def __str__(self):
         return self.username
 
 
     def is_following(self, user):
         """Check if this user is following another user"""
-        return self.following_set.filter(id=user.id).exists()
+        # Read from the database: the follow graph of this process may not
+        # have seen a follow another process just made
+        return self.following.filter(id=user.id).exists()
 
     def add_follower(self, user):
         """Add a follower (user follows this user)"""
-        if user != self and not self.followers.filter(id=user.id).exists():
-            self.followers.add(user)
-            return True
-        return False
+        return user.follow(self)
 
     def remove_follower(self, user):
         """Remove a follower (user unfollows this user)"""
-        if self.followers.filter(id=user.id).exists():
-            self.followers.remove(user)
-            return True
-        return False
+        return user.unfollow(self)
 
     def follow(self, user):
         """Make this user follow another user"""
-        if user != self and not user.followers.filter(id=self.id).exists():
+        if user == self:
+            return False
+        with transaction.atomic():
+            if user.followers.filter(id=self.id).exists():
+                return False
             user.followers.add(self)
-            return True
-        return False
+            self._adjust_follow_counts([user.pk], 1)
+        user.refresh_from_db(fields=['follower_count'])
+        return True
 
     def unfollow(self, user):
         """Make this user unfollow another user"""
-        if user.followers.filter(id=self.id).exists():
+        with transaction.atomic():
+            if not user.followers.filter(id=self.id).exists():
+                return False
             user.followers.remove(self)
-            return True
-        return False
\ No newline at end of file
+            self._adjust_follow_counts([user.pk], -1)
+        user.refresh_from_db(fields=['follower_count'])
+        return True
+
+    def follow_many(self, user_ids):
+        """
+        Follow several users with one INSERT and return the ids newly
+        followed. Ids already followed and this user's own id are skipped;
+        callers check that the ids exist.
+        """
+        Follow = type(self).followers.through
+        user_ids = set(user_ids) - {self.pk}
+        with transaction.atomic():
+            added = sorted(user_ids - self._followed_among(user_ids))
+            if not added:
+                return []
+            Follow.objects.bulk_create(
+                [Follow(from_customuser_id=user_id, to_customuser_id=self.pk) for user_id in added],
+                ignore_conflicts=True
+            )
+            self._adjust_follow_counts(added, 1)
+            self._follows_changed('post_add', added)
+        return added
+
+    def unfollow_many(self, user_ids):
+        """Unfollow several users with one DELETE and return the ids removed"""
+        Follow = type(self).followers.through
+        with transaction.atomic():
+            removed = sorted(self._followed_among(set(user_ids)))
+            if not removed:
+                return []
+            Follow.objects.filter(to_customuser_id=self.pk, from_customuser_id__in=removed).delete()
+            self._adjust_follow_counts(removed, -1)
+            self._follows_changed('post_remove', removed)
+        return removed
+
+    def _followed_among(self, user_ids):
+        """The subset of user_ids this user follows, read from the database"""
+        Follow = type(self).followers.through
+        return set(
+            Follow.objects.filter(to_customuser_id=self.pk, from_customuser_id__in=user_ids)
+            .values_list('from_customuser_id', flat=True)
+        )
+
+    def _follows_changed(self, action, user_ids):
+        """Tell follow receivers (timelines, follow graph) about a bulk change"""
+        m2m_changed.send(
+            sender=type(self).followers.through,
+            instance=self,
+            action=action,
+            reverse=True,
+            model=type(self),
+            pk_set=set(user_ids),
+            using=self._state.db or 'default'
+        )
+
+    def _adjust_follow_counts(self, user_ids, delta):
+        """
+        Move the counters of follow edges from this user to user_ids with
+        F() updates, never below zero
+        """
+        type(self).objects.filter(pk__in=user_ids).update(
+            follower_count=Greatest(F('follower_count') + delta, Value(0))
+        )
+        type(self).objects.filter(pk=self.pk).update(
+            following_count=Greatest(F('following_count') + delta * len(user_ids), Value(0))
+        )
+        # Read the new value back; this instance may be an older snapshot
+        self.refresh_from_db(fields=['following_count'])
+
+
+class FollowSuggestions(models.Model):
+    """
+    Precomputed "who to follow" list for one user, written by the
+    compute_follow_suggestions command and read with one primary key lookup
+    """
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follow_suggestions'
+    )
+    # Best first: [{'id': 12, 'mutual': 4}, ...]
+    suggestions = models.JSONField(default=list, blank=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
+    # Moved forward when the user follows or unfollows someone; rows
+    # changed after computed_at are refreshed by the next incremental run
+    graph_changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Suggestions for {self.user_id}"
@@ -0,0 +1,116 @@
+"""
+Ranked username search. Prefix matches come first, in username order,
+and are read as a range over an index on the upper-cased username so a
+short query stops after `limit` rows. Queries of at least three
+characters then add substring matches.
+
+Two backends share that plan. TrigramUserSearch, for PostgreSQL, ranks
+substring matches by trigram similarity; migration 0003 adds the
+expression indexes it relies on. SimpleUserSearch does the same with
+plain LIKE queries and serves SQLite and tests.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models.functions import Collate, Length, Upper
+from django.utils.module_loading import import_string
+
+from .models import CustomUser
+
+
+def search_limits():
+    """(default page size, largest page size, deepest rank returned)"""
+    return (
+        getattr(settings, 'USER_SEARCH_PAGE_SIZE', 10),
+        getattr(settings, 'USER_SEARCH_MAX_PAGE_SIZE', 50),
+        getattr(settings, 'USER_SEARCH_MAX_RESULTS', 200),
+    )
+
+
+def search_window(params):
+    """Read ?offset= and ?limit= and clamp them to the configured bounds"""
+    page_size, max_page_size, max_results = search_limits()
+
+    def read(name, default):
+        try:
+            return int(params.get(name, default))
+        except (TypeError, ValueError):
+            return default
+
+    limit = max(1, min(read('limit', page_size), max_page_size, max_results))
+    offset = max(0, min(read('offset', 0), max_results - limit))
+    return offset, limit
+
+
+def prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class UserSearch:
+    min_substring_length = 3
+
+    def __init__(self, queryset=None):
+        self.queryset = queryset if queryset is not None else CustomUser.objects.all()
+
+    def sort_key(self):
+        """Expression matching the prefix index, compared in code point order"""
+        return Upper('username')
+
+    def prefix_matches(self, query):
+        prefix = query.upper()
+        return (
+            self.queryset.annotate(search_key=self.sort_key())
+            .filter(search_key__gte=prefix, search_key__lt=prefix_upper_bound(prefix))
+            .order_by('search_key', 'id')
+        )
+
+    def substring_matches(self, query):
+        raise NotImplementedError
+
+    def search(self, query, offset, count):
+        """Return up to `count` matches starting at rank `offset`"""
+        if not query:
+            return list(self.queryset.order_by('id')[offset:offset + count])
+        wanted = offset + count
+        users = list(self.prefix_matches(query)[:wanted])
+        if len(users) < wanted and len(query) >= self.min_substring_length:
+            more = self.substring_matches(query).exclude(username__istartswith=query)
+            users += list(more[:wanted - len(users)])
+        return users[offset:]
+
+
+class SimpleUserSearch(UserSearch):
+    """LIKE-based stand-in, ranking substring matches by username length"""
+
+    def substring_matches(self, query):
+        return (
+            self.queryset.filter(username__icontains=query)
+            .order_by(Length('username'), 'username', 'id')
+        )
+
+
+class TrigramUserSearch(UserSearch):
+    """PostgreSQL search backed by the pg_trgm and "C"-collated indexes"""
+
+    def sort_key(self):
+        return Collate(Upper('username'), 'C')
+
+    def substring_matches(self, query):
+        from django.contrib.postgres.search import TrigramSimilarity
+        return (
+            self.queryset.filter(username__icontains=query)
+            .annotate(similarity=TrigramSimilarity('username', query))
+            .order_by('-similarity', Length('username'), 'id')
+        )
+
+
+def get_user_search(queryset=None):
+    """The configured search backend, or one suited to the database"""
+    path = getattr(settings, 'USER_SEARCH_BACKEND', None)
+    if path:
+        backend = import_string(path)
+    elif connection.vendor == 'postgresql':
+        backend = TrigramUserSearch
+    else:
+        backend = SimpleUserSearch
+    return backend(queryset)
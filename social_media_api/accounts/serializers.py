@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.authtoken.models import Token  # Added Token import
@@ -90,4 +91,14 @@ class UserFollowSerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
         fields = ('id', 'username', 'first_name', 'last_name', 
-                 'follower_count', 'following_count')
\ No newline at end of file
+                 'follower_count', 'following_count')
+
+class BulkFollowSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_user_ids(self, value):
+        limit = getattr(settings, 'FOLLOW_BULK_MAX_USERS', 500)
+        user_ids = list(dict.fromkeys(value))
+        if len(user_ids) > limit:
+            raise serializers.ValidationError(f"At most {limit} users per request.")
+        return user_ids
@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .graph import follow_graph
+from .models import CustomUser
+from .stats import adjust_user_count
+from .suggestions import mark_graph_changed
+
+
+@receiver(m2m_changed, sender=CustomUser.followers.through)
+def invalidate_follow_graph(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop the cached followees of users whose follows changed"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear' and not reverse:
+        # The followers of a cleared relation are unknown here
+        follow_graph.clear()
+        return
+
+    # Forward side: instance is the followed user, pk_set are followers
+    follow_graph.invalidate([instance.pk] if reverse else pk_set)
+
+
+@receiver(m2m_changed, sender=CustomUser.followers.through)
+def flag_stale_suggestions(sender, instance, action, reverse, pk_set, **kwargs):
+    """Users whose followees changed, and their followers, get fresh suggestions on the next run"""
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    mark_graph_changed([instance.pk] if reverse else pk_set)
+
+
+@receiver(post_save, sender=CustomUser)
+def count_signup(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: adjust_user_count(1))
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_cached_auth(sender, instance, created, **kwargs):
+    """A saved user may be deactivated or changed; drop cached copies"""
+    if not created:
+        token_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_delete, sender=CustomUser)
+def count_deletion(sender, instance, **kwargs):
+    transaction.on_commit(lambda: adjust_user_count(-1))
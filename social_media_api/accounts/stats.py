@@ -0,0 +1,84 @@
+"""
+Global user count served from the cache instead of a COUNT(*) over the
+users table. Signups and deletions adjust the cached value, and it is
+recomputed when it expires or when refresh_user_count runs. With
+USER_COUNT_ESTIMATE set, recomputing reads the planner's row estimate
+on PostgreSQL instead of counting.
+
+The cache is only a shortcut: when its backend fails, reads fall back to
+counting and adjustments are skipped, so signups never fail on it.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'accounts:user_count'
+
+
+def refresh_interval():
+    return getattr(settings, 'USER_COUNT_REFRESH_SECONDS', 3600)
+
+
+def estimated_user_count():
+    """Row estimate from planner statistics, or None where there is none"""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [CustomUser._meta.db_table]
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 for a table that was never analyzed
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def count_users(estimate=None):
+    if estimate is None:
+        estimate = getattr(settings, 'USER_COUNT_ESTIMATE', False)
+    if estimate:
+        value = estimated_user_count()
+        if value is not None:
+            return value
+    return CustomUser.objects.count()
+
+
+def refresh_user_count(estimate=None):
+    """Recompute the statistic and store it"""
+    value = count_users(estimate)
+    try:
+        cache.set(CACHE_KEY, value, refresh_interval())
+    except Exception:
+        logger.warning('Could not cache the user count', exc_info=True)
+    return value
+
+
+def total_users():
+    """Number of users, in O(1) unless the statistic has to be recomputed"""
+    try:
+        value = cache.get(CACHE_KEY)
+    except Exception:
+        logger.warning('User count cache unavailable, counting instead', exc_info=True)
+        return count_users()
+    if value is None:
+        value = refresh_user_count()
+    return value
+
+
+def adjust_user_count(delta):
+    try:
+        cache.incr(CACHE_KEY, delta)
+    except ValueError:
+        # Not cached; the next read recomputes it
+        pass
+    except Exception:
+        # The cached value, if any, is corrected when it expires
+        logger.warning('Could not adjust the cached user count', exc_info=True)
@@ -0,0 +1,162 @@
+"""
+Friends-of-friends follow suggestions, computed in batch. The following
+adjacency is loaded once as sorted id arrays; a user's candidates are the
+accounts followed by the accounts they follow, ranked by how many of
+their followees lead to each one. Ranking is pure Python over that
+in-memory graph, so it can be spread across a process pool; the graph
+reaches workers through the pool initializer.
+"""
+import heapq
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+ID_BATCH_SIZE = 5000
+
+# Set in each pool worker by init_worker
+worker_graph = None
+worker_top_k = None
+
+
+def top_k():
+    return getattr(settings, 'FOLLOW_SUGGESTIONS_TOP_K', 20)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    return iter(lambda: list(islice(iterator, size)), [])
+
+
+def load_following(user_ids=None):
+    """
+    {follower_id: array of followee ids} for the given users, or for
+    everyone when user_ids is None
+    """
+    from .models import CustomUser
+    Follow = CustomUser.followers.through
+    # In the followers table from_customuser is followed by to_customuser
+    edges = Follow.objects.order_by('to_customuser_id', 'from_customuser_id').values_list(
+        'to_customuser_id', 'from_customuser_id'
+    )
+    batches = [None] if user_ids is None else batched(user_ids, ID_BATCH_SIZE)
+
+    graph = {}
+    for batch in batches:
+        rows = edges if batch is None else edges.filter(to_customuser_id__in=batch)
+        for follower_id, followee_id in rows.iterator(chunk_size=10000):
+            graph.setdefault(follower_id, array('q')).append(followee_id)
+    return graph
+
+
+def load_two_hops(user_ids):
+    """The adjacency needed to rank user_ids: theirs and their followees'"""
+    graph = load_following(user_ids)
+    followees = set().union(*graph.values()) - graph.keys() if graph else set()
+    graph.update(load_following(sorted(followees)))
+    return graph
+
+
+def rank_suggestions(user_id, graph, count):
+    """Top `count` accounts two hops away, as [{'id', 'mutual'}] best first"""
+    following = graph.get(user_id, ())
+    mutual = Counter()
+    for followee_id in following:
+        mutual.update(graph.get(followee_id, ()))
+    for seen_id in following:
+        mutual.pop(seen_id, None)
+    mutual.pop(user_id, None)
+
+    best = heapq.nsmallest(count, mutual.items(), key=lambda item: (-item[1], item[0]))
+    return [{'id': candidate_id, 'mutual': paths} for candidate_id, paths in best]
+
+
+def init_worker(graph, count):
+    global worker_graph, worker_top_k
+    worker_graph = graph
+    worker_top_k = count
+
+
+def rank_batch(user_ids):
+    return [(user_id, rank_suggestions(user_id, worker_graph, worker_top_k)) for user_id in user_ids]
+
+
+def rank_users(user_ids, graph, count, workers=1, batch_size=500):
+    """Yield (user_id, suggestions), ranking batches in parallel when workers > 1"""
+    if workers <= 1:
+        for user_id in user_ids:
+            yield user_id, rank_suggestions(user_id, graph, count)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(graph, count)) as pool:
+        for results in pool.map(rank_batch, batched(user_ids, batch_size)):
+            yield from results
+
+
+def stale_user_ids():
+    """Users flagged by mark_graph_changed since their list was computed, or never computed"""
+    from .models import CustomUser, FollowSuggestions
+    changed = FollowSuggestions.objects.filter(
+        Q(computed_at__isnull=True) | Q(graph_changed_at__gt=F('computed_at'))
+    ).values_list('user_id', flat=True)
+    missing = CustomUser.objects.filter(
+        following_count__gt=0, follow_suggestions__isnull=True
+    ).values_list('id', flat=True)
+    return sorted(set(changed.iterator()) | set(missing.iterator()))
+
+
+def save_suggestions(results, computed_at, batch_size=1000):
+    """Upsert (user_id, suggestions) pairs; returns how many were written"""
+    from .models import FollowSuggestions
+    written = 0
+    for batch in batched(results, batch_size):
+        FollowSuggestions.objects.bulk_create(
+            [
+                FollowSuggestions(
+                    user_id=user_id,
+                    suggestions=suggestions,
+                    computed_at=computed_at,
+                    graph_changed_at=computed_at
+                )
+                for user_id, suggestions in batch
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['suggestions', 'computed_at']
+        )
+        written += len(batch)
+    return written
+
+
+def refresh_suggestions(full=False, workers=1, count=None):
+    """
+    Recompute suggestions for every user with followees (full) or only
+    for stale users. Changes made while this runs stay stale, because
+    computed_at is the time the run started.
+    """
+    started = timezone.now()
+    count = count or top_k()
+    if full:
+        graph = load_following()
+        user_ids = sorted(graph)
+    else:
+        user_ids = stale_user_ids()
+        graph = load_two_hops(user_ids) if user_ids else {}
+    return save_suggestions(rank_users(user_ids, graph, count, workers), started)
+
+
+def mark_graph_changed(user_ids):
+    """
+    Flag users whose followees changed for the next incremental run, and
+    their followers, whose two-hop candidates run through those followees
+    """
+    from .models import CustomUser, FollowSuggestions
+    Follow = CustomUser.followers.through
+    user_ids = list(user_ids)
+    followers = Follow.objects.filter(from_customuser_id__in=user_ids).values('to_customuser_id')
+    FollowSuggestions.objects.filter(
+        Q(user_id__in=user_ids) | Q(user_id__in=followers)
+    ).update(graph_changed_at=timezone.now())
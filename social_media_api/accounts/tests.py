@@ -1,3 +1,63 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .authentication import token_cache
+from .hashing import hash_password, setup_worker
+from .models import CustomUser, FollowSuggestions
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('staff', password='x', is_staff=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        token_cache.local.clear()
+
+    def test_unavailable_cache_falls_back_to_the_database(self):
+        broken = mock.Mock(**{
+            f'{name}.side_effect': ConnectionError('cache down')
+            for name in ('get', 'set', 'delete')
+        })
+        with mock.patch('accounts.authentication.cache', broken), self.assertLogs('accounts.authentication', 'WARNING'):
+            self.assertEqual(self.client.get('/api/auth/token-cache/stats/').status_code, 200)
+            token_cache.local.clear()
+            self.assertEqual(self.client.get('/api/auth/token-cache/stats/').status_code, 200)
+
+            self.user.is_active = False
+            self.user.save()
+            self.assertEqual(self.client.get('/api/auth/token-cache/stats/').status_code, 401)
+
+
+class HashingPoolTests(TestCase):
+    def test_spawned_workers_hash_passwords(self):
+        # A spawned worker imports the pool functions before Django is set up
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=setup_worker) as pool:
+            hashed, unusable = pool.map(hash_password, ['secret', ''])
+        self.assertTrue(check_password('secret', hashed))
+        self.assertFalse(check_password('', unusable))
+
+
+class FollowSuggestionsTests(TestCase):
+    def suggested(self, user):
+        return [entry['id'] for entry in FollowSuggestions.objects.get(user=user).suggestions]
+
+    def test_followers_are_refreshed_when_a_followee_follows_someone(self):
+        a, b, c, d = (CustomUser.objects.create_user(name, password='x') for name in 'abcd')
+        a.follow(b)
+        b.follow(d)
+        call_command('compute_follow_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggested(a), [d.id])
 
-# Create your tests here.
+        # a's followees are unchanged, but c is now two hops away from a
+        b.follow(c)
+        call_command('compute_follow_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggested(a), [c.id, d.id])
@@ -8,6 +8,8 @@ urlpatterns = [
     path('profile/', views.user_profile, name='profile'),
     
     # Follow management endpoints
+    path('follow/bulk/', views.bulk_follow_users, name='bulk_follow'),
+    path('unfollow/bulk/', views.bulk_unfollow_users, name='bulk_unfollow'),
     path('follow/<int:user_id>/', views.follow_user, name='follow'),
     path('unfollow/<int:user_id>/', views.unfollow_user, name='unfollow'),
     path('followers/', views.get_followers, name='my_followers'),
@@ -15,6 +17,9 @@ urlpatterns = [
     path('following/', views.get_following, name='my_following'),
     path('following/<int:user_id>/', views.get_following, name='user_following'),
     path('follow-status/<int:user_id>/', views.check_follow_status, name='follow_status'),
+    path('suggestions/', views.follow_suggestions, name='follow_suggestions'),
+    
+    path('token-cache/stats/', views.token_cache_stats, name='token_cache_stats'),
     
     # GenericAPIView endpoints
     path('users/', views.UserListView.as_view(), name='user_list'),
@@ -1,12 +1,31 @@
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import generics
 from django.contrib.auth import login, logout
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer, UserFollowSerializer
-from .models import CustomUser
+from .serializers import (
+    UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer, UserFollowSerializer,
+    BulkFollowSerializer
+)
+from .authentication import token_cache
+from .graph import follow_graph
+from .models import CustomUser, FollowSuggestions
+from .search import get_user_search, search_limits, search_window
+from .stats import total_users
+from notifications.models import Notification
+from notifications.outbox import build_event, enqueue, enqueue_many
+from social_media_api.pagination import KeysetPagination
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -58,9 +77,6 @@ def follow_user(request, user_id):
     """
     Follow another user
     """
-    # Using CustomUser.objects.all() as requested
-    all_users = CustomUser.objects.all()
-    
     try:
         user_to_follow = CustomUser.objects.get(id=user_id)
     except CustomUser.DoesNotExist:
@@ -69,19 +85,25 @@ def follow_user(request, user_id):
     if request.user == user_to_follow:
         return Response({'error': 'Cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if request.user.follow(user_to_follow):
+    # The follow and its outbox event commit together
+    with transaction.atomic():
+        followed = request.user.follow(user_to_follow)
+        if followed:
+            enqueue(user_to_follow, request.user, Notification.FOLLOW)
+
+    if followed:
         return Response({
             'message': f'Successfully followed {user_to_follow.username}',
             'following': True,
             'followers_count': user_to_follow.follower_count,
             'following_count': request.user.following_count,
-            'total_users': all_users.count()
+            'total_users': total_users()
         }, status=status.HTTP_200_OK)
     else:
         return Response({
             'message': f'Already following {user_to_follow.username}',
             'following': True,
-            'total_users': all_users.count()
+            'total_users': total_users()
         }, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
@@ -90,9 +112,6 @@ def unfollow_user(request, user_id):
     """
     Unfollow another user
     """
-    # Using CustomUser.objects.all() as requested
-    all_users = CustomUser.objects.all()
-    
     try:
         user_to_unfollow = CustomUser.objects.get(id=user_id)
     except CustomUser.DoesNotExist:
@@ -104,15 +123,60 @@ def unfollow_user(request, user_id):
             'following': False,
             'followers_count': user_to_unfollow.follower_count,
             'following_count': request.user.following_count,
-            'total_users': all_users.count()
+            'total_users': total_users()
         }, status=status.HTTP_200_OK)
     else:
         return Response({
             'message': f'Not following {user_to_unfollow.username}',
             'following': False,
-            'total_users': all_users.count()
+            'total_users': total_users()
         }, status=status.HTTP_200_OK)
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_follow_users(request):
+    """
+    Follow many users at once, e.g. after a contact import
+    """
+    serializer = BulkFollowSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    user_ids = serializer.validated_data['user_ids']
+
+    # One query validates every id
+    found = set(CustomUser.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    with transaction.atomic():
+        followed = request.user.follow_many(found)
+        enqueue_many([
+            build_event(user_id, request.user, Notification.FOLLOW) for user_id in followed
+        ])
+
+    return Response({
+        'followed': followed,
+        'already_following': sorted(found - set(followed) - {request.user.id}),
+        'not_found': sorted(set(user_ids) - found),
+        'following_count': request.user.following_count
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_unfollow_users(request):
+    """
+    Unfollow many users at once
+    """
+    serializer = BulkFollowSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    user_ids = serializer.validated_data['user_ids']
+
+    unfollowed = request.user.unfollow_many(user_ids)
+
+    return Response({
+        'unfollowed': unfollowed,
+        'not_following': sorted(set(user_ids) - set(unfollowed)),
+        'following_count': request.user.following_count
+    }, status=status.HTTP_200_OK)
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_followers(request, user_id=None):
@@ -127,14 +191,11 @@ def get_followers(request, user_id=None):
     followers = user.followers.all()
     serializer = UserFollowSerializer(followers, many=True)
 
-    # Using CustomUser.objects.all() as requested
-    all_users = CustomUser.objects.all()
-    
     return Response({
         'user': user.username,
         'followers_count': user.follower_count,
         'followers': serializer.data,
-        'total_users': all_users.count()
+        'total_users': total_users()
     })
 
 @api_view(['GET'])
@@ -151,14 +212,11 @@ def get_following(request, user_id=None):
     following = user.following
     serializer = UserFollowSerializer(following, many=True)
     
-    # Using CustomUser.objects.all() as requested
-    all_users = CustomUser.objects.all()
-    
     return Response({
         'user': user.username,
         'following_count': user.following_count,
         'following': serializer.data,
-        'total_users': all_users.count()
+        'total_users': total_users()
     })
 
 @api_view(['GET'])
@@ -174,16 +232,47 @@ def check_follow_status(request, user_id):
     
     is_following = request.user.is_following(target_user)
     
-    # Using CustomUser.objects.all() as requested
-    all_users = CustomUser.objects.all()
-    
     return Response({
         'is_following': is_following,
         'target_user': target_user.username,
         'current_user': request.user.username,
-        'total_users': all_users.count()
+        'total_users': total_users()
+    })
+
+class UserPagination(KeysetPagination):
+    ordering = ('id',)
+    page_size = 50
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def follow_suggestions(request):
+    """
+    Who to follow: precomputed friends-of-friends suggestions
+    """
+    # One primary key lookup; compute_follow_suggestions keeps the row fresh
+    row = FollowSuggestions.objects.filter(user_id=request.user.id).values(
+        'suggestions', 'computed_at'
+    ).first()
+    suggestions = row['suggestions'] if row else []
+    
+    # Drop accounts followed since the list was computed
+    suggestions = [s for s in suggestions if not follow_graph.is_following(request.user.id, s['id'])]
+    users = CustomUser.objects.in_bulk([s['id'] for s in suggestions])
+    
+    return Response({
+        'computed_at': row['computed_at'] if row else None,
+        'suggestions': [
+            {**UserFollowSerializer(users[s['id']]).data, 'mutual_count': s['mutual']}
+            for s in suggestions if s['id'] in users
+        ]
     })
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def token_cache_stats(request):
+    """Hit rate of this process's token authentication cache"""
+    return Response(token_cache.snapshot())
+
 # GenericAPIView classes
 class UserListView(generics.GenericAPIView):
     """
@@ -192,16 +281,58 @@ class UserListView(generics.GenericAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserFollowSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UserPagination
 
     def get(self, request):
-        all_users = CustomUser.objects.all()
-        serializer = self.get_serializer(all_users, many=True)
+        if request.query_params.get('stream') == 'ndjson':
+            return self.stream(request)
+
+        users = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(users, many=True)
         
         return Response({
-            'total_users': all_users.count(),
+            'total_users': total_users(),
+            **self.paginator.get_page_info(),
             'users': serializer.data
         })
 
+    def stream(self, request):
+        """
+        Every user as newline-delimited JSON, for internal consumers.
+        Rows are read with a server-side cursor and serialized one chunk
+        at a time, so memory stays flat however many users there are.
+        Under ASGI the chunks are produced by an async iterator: Django
+        would read a sync iterator to the end before sending anything.
+        """
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Streaming the user list is limited to staff'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        chunk_size = getattr(settings, 'USER_STREAM_CHUNK_SIZE', 2000)
+        fields = self.get_serializer_class().Meta.fields
+        rows = self.get_queryset().order_by('id').only(*fields).iterator(chunk_size=chunk_size)
+
+        def chunks():
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    return
+                yield ''.join(
+                    json.dumps(data, cls=DjangoJSONEncoder) + '\n'
+                    for data in self.get_serializer(chunk, many=True).data
+                )
+
+        async def async_chunks():
+            # One thread-sensitive hop per chunk keeps the cursor on one thread
+            pending = chunks()
+            read = sync_to_async(next)
+            while (data := await read(pending, None)) is not None:
+                yield data
+
+        content = async_chunks() if isinstance(request._request, ASGIRequest) else chunks()
+        return StreamingHttpResponse(content, content_type='application/x-ndjson')
+
 class UserSearchView(generics.GenericAPIView):
     """
     GenericAPIView for searching users
@@ -210,20 +341,21 @@ class UserSearchView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        search_query = request.query_params.get('search', '')
+        search_query = request.query_params.get('search', '').strip()
+        offset, limit = search_window(request.query_params)
+        _, _, max_results = search_limits()
         
-        if search_query:
-            users = CustomUser.objects.all().filter(
-                username__icontains=search_query
-            )
-        else:
-            users = CustomUser.objects.all()
+        # Ranked prefix then substring matches; reads at most offset + limit + 1 rows
+        users = get_user_search().search(search_query, offset, limit + 1)
+        has_next = len(users) > limit and offset + limit < max_results
         
-        serializer = self.get_serializer(users, many=True)
+        serializer = self.get_serializer(users[:limit], many=True)
         
         return Response({
             'search_query': search_query,
-            'total_results': users.count(),
+            'offset': offset,
+            'limit': limit,
+            'next_offset': offset + limit if has_next else None,
             'users': serializer.data
         })
 
@@ -0,0 +1,146 @@
+"""
+O(1) notification counts and read state. Each user has a
+NotificationCounter row that the write paths adjust, with a cache entry in
+front of it for badge polling. A missing row is rebuilt from the
+Notification table on first use.
+
+The row also holds a read_through watermark: "mark all read" moves the
+watermark instead of updating every notification, and a notification is
+unread only if its read flag is unset and it is newer than the watermark.
+An event delivered after the watermark moved is dated past it, however
+old it is, so it still shows up as unread.
+fold_read_watermarks later copies the watermark into the read flags.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import live
+from .models import Notification, NotificationCounter
+
+CACHE_TIMEOUT = 300
+
+
+def cache_key(user_id):
+    return f'notification_counts:{user_id}'
+
+
+def forget_counts(user_ids):
+    """
+    Drop cached counts once the current transaction commits. Deleting
+    earlier would let a concurrent read cache the pre-commit values.
+    """
+    keys = [cache_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def unread_filter(read_through):
+    """Q matching unread notifications for a user with this watermark"""
+    if read_through is None:
+        return Q(read=False)
+    return Q(read=False, timestamp__gt=read_through)
+
+
+def is_unread(notification, read_through):
+    if notification.read:
+        return False
+    return read_through is None or notification.timestamp > read_through
+
+
+def read_through_map(user_ids, lock=False):
+    """
+    {user_id: watermark} for the given users that have one. With lock,
+    their counter rows stay locked until the caller commits, which holds
+    back mark_all_read for them.
+    """
+    counters = NotificationCounter.objects.filter(user_id__in=user_ids)
+    if lock:
+        counters = counters.select_for_update().order_by('user_id')
+    return {
+        user_id: read_through
+        for user_id, read_through in counters.values_list('user_id', 'read_through')
+        if read_through is not None
+    }
+
+
+def delivery_timestamp(timestamp, read_through):
+    """
+    The timestamp to store for an event delivered now. An event queued
+    before "mark all read" but delivered after it would land behind the
+    watermark and be created already read; it moves just past it instead.
+    """
+    if read_through is None or timestamp > read_through:
+        return timestamp
+    return max(timezone.now(), read_through + timedelta(microseconds=1))
+
+
+def rebuild_counts(user_id):
+    """Recount one user's notifications and store the result"""
+    read_through = read_through_map([user_id]).get(user_id)
+    counts = Notification.objects.filter(recipient_id=user_id).aggregate(
+        total=Count('id'),
+        unread=Count('id', filter=unread_filter(read_through))
+    )
+    try:
+        with transaction.atomic():
+            NotificationCounter.objects.update_or_create(user_id=user_id, defaults=counts)
+    except IntegrityError:
+        # Another request created the row first; its values are as fresh
+        pass
+    forget_counts([user_id])
+    return {**counts, 'read_through': read_through}
+
+
+def get_counts(user_id):
+    """
+    Return {'total', 'unread', 'read_through'} for a user without scanning
+    notifications.
+    """
+    counts = cache.get(cache_key(user_id))
+    if counts is not None:
+        return counts
+    counts = (
+        NotificationCounter.objects.filter(user_id=user_id)
+        .values('total', 'unread', 'read_through')
+        .first()
+    )
+    if counts is None:
+        counts = rebuild_counts(user_id)
+    cache.set(cache_key(user_id), counts, CACHE_TIMEOUT)
+    return counts
+
+
+def adjust_counts(deltas):
+    """
+    Apply {user_id: (total_delta, unread_delta)} after notifications were
+    written. Call this after the write, so that a rebuilt row includes it.
+    """
+    for user_id, (total_delta, unread_delta) in deltas.items():
+        if not total_delta and not unread_delta:
+            continue
+        updated = NotificationCounter.objects.filter(user_id=user_id).update(
+            total=Greatest(F('total') + total_delta, Value(0)),
+            unread=Greatest(F('unread') + unread_delta, Value(0))
+        )
+        if not updated:
+            rebuild_counts(user_id)
+    forget_counts(deltas)
+    live.publish_counts(deltas)
+
+
+def mark_all_read(user_id, when=None):
+    """Move the user's read watermark to `when`: a single-row write"""
+    counter = NotificationCounter.objects.filter(user_id=user_id)
+    with transaction.atomic():
+        if counter.select_for_update().values_list('user_id', flat=True).first() is None:
+            rebuild_counts(user_id)
+        # Taken under the row lock, so an outbox batch delivering to this
+        # user has committed and everything it wrote is covered
+        when = when or timezone.now()
+        counter.update(read_through=when, unread=0)
+    forget_counts([user_id])
+    live.publish_counts([user_id])
@@ -0,0 +1,217 @@
+"""
+Pub/sub behind the live notification stream. Each open stream subscribes
+to its user's channel on this process's broker with an asyncio queue.
+
+The notification write paths run in the outbox worker, not in the ASGI
+process serving the streams, so they publish after their transaction
+commits to a Redis channel (NOTIFICATION_STREAM_REDIS_URL). Every ASGI
+process runs one listener task that relays that channel to its broker.
+Without a Redis URL, messages only reach streams open in the publishing
+process; a development server then relies on the heartbeat re-reading
+the counts.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'notifications:live'
+
+
+def redis_url():
+    return getattr(settings, 'NOTIFICATION_STREAM_REDIS_URL', None)
+
+
+def stream_queue_size():
+    return getattr(settings, 'NOTIFICATION_STREAM_QUEUE_SIZE', 100)
+
+
+class Subscription:
+    """One open stream: a bounded queue living on the stream's event loop"""
+
+    def __init__(self, user_id, loop, maxsize):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, message):
+        # Runs on self.loop. A slow client loses its oldest messages, never
+        # the newest counts.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+
+class Broker:
+    """Fans messages for a user out to that user's subscriptions"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def subscribe(self, user_id):
+        """Open a subscription; call from the coroutine that will read it"""
+        subscription = Subscription(user_id, asyncio.get_running_loop(), stream_queue_size())
+        with self.lock:
+            self.subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.user_id]
+
+    def has_subscribers(self, user_id):
+        return user_id in self.subscriptions
+
+    def connection_count(self):
+        with self.lock:
+            return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+    def publish(self, user_id, event, data):
+        """Send (event, data) to every subscription of user_id; thread-safe"""
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, (event, data))
+            except RuntimeError:
+                # The stream's loop has shut down; its cleanup will unsubscribe
+                pass
+
+
+broker = Broker()
+
+
+class Listener:
+    """
+    Relays the Redis channel to this process's broker. One task per event
+    loop, started by the first stream and reconnecting with backoff.
+    """
+
+    def __init__(self):
+        self.task = None
+        self.connected = False
+        # Bumped on every (re)connect; messages may be lost in between
+        self.generation = 0
+
+    def ensure_started(self):
+        if not redis_url():
+            return
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self.run())
+
+    async def run(self):
+        from redis import asyncio as aioredis
+        from redis.exceptions import RedisError
+        delay = 1
+        while True:
+            client = aioredis.Redis.from_url(redis_url())
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    self.connected = True
+                    self.generation += 1
+                    delay = 1
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            self.dispatch(message['data'])
+            except (RedisError, OSError) as exc:
+                logger.warning('Notification stream listener disconnected: %s', exc)
+            finally:
+                self.connected = False
+                await client.aclose()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def dispatch(self, payload):
+        for user_id, event, data in json.loads(payload):
+            if broker.has_subscribers(user_id):
+                broker.publish(user_id, event, data)
+
+
+listener = Listener()
+
+publisher = None
+
+
+def get_publisher():
+    global publisher
+    if publisher is None:
+        import redis
+        publisher = redis.Redis.from_url(redis_url())
+    return publisher
+
+
+def publish_on_commit(messages):
+    """
+    Deliver [(user_id, event, build)] once the current transaction commits;
+    build() returns the message data. Without a Redis channel, messages for
+    users with no stream in this process are dropped unbuilt.
+    """
+    if not redis_url():
+        messages = [message for message in messages if broker.has_subscribers(message[0])]
+    if messages:
+        # A failed publish is logged; live updates must not fail the write
+        transaction.on_commit(partial(deliver, messages), robust=True)
+
+
+def deliver(messages):
+    built = [(user_id, event, build()) for user_id, event, build in messages]
+    if redis_url():
+        get_publisher().publish(CHANNEL, json.dumps(built, cls=DjangoJSONEncoder))
+    else:
+        for user_id, event, data in built:
+            broker.publish(user_id, event, data)
+
+
+def notification_payload(notification):
+    from .serializers import LiveNotificationSerializer
+    return LiveNotificationSerializer(notification).data
+
+
+def publish_notifications(notifications):
+    """Push new or re-coalesced notifications to their recipients' streams"""
+    publish_on_commit([
+        (notification.recipient_id, 'notification', partial(notification_payload, notification))
+        for notification in notifications
+    ])
+
+
+def publish_counts(user_ids):
+    """Push fresh badge counts after they changed, read with one query"""
+    user_ids = list(user_ids)
+    loaded = {}
+
+    def build(user_id):
+        if 'counts' not in loaded:
+            loaded['counts'] = current_counts(user_ids)
+        return loaded['counts'].get(user_id, {'total': 0, 'unread': 0})
+
+    publish_on_commit([(user_id, 'counts', partial(build, user_id)) for user_id in user_ids])
+
+
+def current_counts(user_ids):
+    """{user_id: count payload} read from the counter rows, not the cache"""
+    return {
+        row.pop('user_id'): row
+        for row in NotificationCounter.objects.filter(user_id__in=user_ids).values('user_id', 'total', 'unread')
+    }
+
+
+def count_payload(counts):
+    return {'total': counts['total'], 'unread': counts['unread']}
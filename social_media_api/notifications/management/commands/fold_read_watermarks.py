@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from notifications.models import Notification, NotificationCounter
+
+
+class Command(BaseCommand):
+    help = 'Copy read watermarks into notification read flags in small chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Notifications flagged per UPDATE (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        users = folded = 0
+
+        watermarks = (
+            NotificationCounter.objects.filter(read_through__isnull=False)
+            .values_list('user_id', 'read_through')
+        )
+        for user_id, read_through in watermarks.iterator():
+            users += 1
+            pending = Notification.objects.filter(
+                recipient_id=user_id, read=False, timestamp__lte=read_through
+            )
+            # Short UPDATEs keep each write lock brief
+            while True:
+                ids = list(pending.values_list('id', flat=True)[:chunk_size])
+                if not ids:
+                    break
+                folded += Notification.objects.filter(id__in=ids).update(read=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Folded {folded} notifications for {users} users'
+        ))
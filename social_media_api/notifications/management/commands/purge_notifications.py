@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications import retention
+from notifications.models import Notification
+
+
+class Command(BaseCommand):
+    help = 'Archive and delete read notifications older than their retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--archive', choices=['table', 'jsonl', 'none'], default='table',
+            help='Where purged rows go: the archive table, gzipped JSONL files or nowhere'
+        )
+        parser.add_argument(
+            '--output-dir', default='notification_archive',
+            help='Directory for --archive jsonl (default: notification_archive)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Rows archived and deleted per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--verb', action='append', dest='verbs',
+            help='Only purge this verb (repeatable)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report how many rows would be purged without changing anything'
+        )
+
+    def handle(self, *args, **options):
+        verbs = options['verbs'] or [verb for verb, _ in Notification.NOTIFICATION_TYPES]
+        unknown = set(verbs) - {verb for verb, _ in Notification.NOTIFICATION_TYPES}
+        if unknown:
+            raise CommandError(f"Unknown verb(s): {', '.join(sorted(unknown))}")
+
+        total = 0
+        for verb in verbs:
+            expired = retention.expired_notifications(verb)
+            days = retention.retention_days(verb)
+            if options['dry_run']:
+                count = expired.count()
+                self.stdout.write(f'{verb}: {count} rows older than {days} days')
+                total += count
+                continue
+
+            purged = self.purge_verb(expired, verb, options)
+            self.stdout.write(f'{verb}: purged {purged} rows older than {days} days')
+            total += purged
+
+        action = 'Would reclaim' if options['dry_run'] else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(f'{action} {total} notification rows'))
+
+    def purge_verb(self, expired, verb, options):
+        purged = 0
+        sequence = 0
+        while True:
+            if options['archive'] == 'table':
+                archive = retention.archive_to_table
+            elif options['archive'] == 'jsonl':
+                sequence += 1
+                archive = lambda rows, n=sequence: retention.archive_to_file(
+                    rows, options['output_dir'], verb, n
+                )
+            else:
+                archive = None
+
+            rows = retention.purge_chunk(expired, options['chunk_size'], archive)
+            purged += len(rows)
+            if len(rows) < options['chunk_size']:
+                return purged
@@ -0,0 +1,106 @@
+import logging
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from notifications import outbox
+
+logger = logging.getLogger(__name__)
+
+# Longest pause between retries after a failed batch, in seconds
+MAX_RETRY_DELAY = 30
+
+
+class Command(BaseCommand):
+    help = 'Drain the notification outbox in batches with a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Number of worker threads, each owning a share of the recipients (default: 2)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=getattr(settings, 'NOTIFICATION_OUTBOX_BATCH_SIZE', 500),
+            help='Events claimed per batch'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Seconds to sleep when the outbox is empty (default: 1.0)'
+        )
+        parser.add_argument(
+            '--stats-every', type=float, default=60.0,
+            help='Seconds between metrics reports (default: 60)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the outbox once and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            total = 0
+            while True:
+                processed = outbox.process_batch(options['batch_size'])
+                total += processed
+                if processed < options['batch_size']:
+                    break
+            self.stdout.write(self.style.SUCCESS(f'Processed {total} events'))
+            self.report()
+            return
+
+        stop = threading.Event()
+        # Process managers stop workers with SIGTERM; finish the current batch first
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [
+                pool.submit(
+                    self.work, stop, options['batch_size'], options['interval'],
+                    (index, options['workers'])
+                )
+                for index in range(options['workers'])
+            ]
+            try:
+                while not stop.is_set() and not all(future.done() for future in futures):
+                    stop.wait(options['stats_every'])
+                    self.report()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self.stdout.write('Stopping workers...')
+                stop.set()
+        for future in futures:
+            future.result()
+
+    def work(self, stop, batch_size, interval, partition):
+        """
+        Worker thread loop; each thread uses its own database connection and
+        only handles the recipients of its partition
+        """
+        delay = retry_delay = max(interval, 1)
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                try:
+                    processed = outbox.process_batch(batch_size, partition)
+                except Exception:
+                    # A deadlock or dropped connection must not retire this
+                    # partition; its events stay in the outbox for the retry
+                    logger.exception('Notification batch failed for partition %s', partition)
+                    connection.close()
+                    stop.wait(delay)
+                    delay = min(delay * 2, MAX_RETRY_DELAY)
+                    continue
+                delay = retry_delay
+                if processed < batch_size:
+                    stop.wait(interval)
+        finally:
+            connection.close()
+
+    def report(self):
+        stats = {**outbox.outbox_stats(), **outbox.metrics.snapshot()}
+        self.stdout.write(' '.join(f'{key}={value}' for key, value in stats.items()))
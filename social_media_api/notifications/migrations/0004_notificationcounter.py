@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('notifications', '0003_notificationevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('unread', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
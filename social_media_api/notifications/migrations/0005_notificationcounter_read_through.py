@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationcounter',
+            name='read_through',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
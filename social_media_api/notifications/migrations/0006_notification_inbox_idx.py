@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0005_notificationcounter_read_through'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-timestamp', '-id'], name='notification_inbox_idx'),
+        ),
+    ]
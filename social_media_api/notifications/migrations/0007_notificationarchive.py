@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notification_inbox_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_id', models.BigIntegerField(unique=True)),
+                ('recipient_id', models.BigIntegerField()),
+                ('actor_id', models.BigIntegerField()),
+                ('verb', models.CharField(choices=[('follow', 'Follow'), ('like', 'Like'), ('comment', 'Comment'), ('mention', 'Mention'), ('share', 'Share')], max_length=20)),
+                ('content_type_id', models.IntegerField(blank=True, null=True)),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('actor_count', models.PositiveIntegerField(default=1)),
+                ('timestamp', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipient_id', '-timestamp'], name='notification_archive_idx')],
+            },
+        ),
+    ]
@@ -42,23 +42,105 @@ class Notification(models.Model):
     object_id = models.PositiveIntegerField(null=True, blank=True)
     target = GenericForeignKey('content_type', 'object_id')
 
+    # Coalesced events: how many actors this row stands for and the latest few
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(
+                fields=['recipient', 'verb', 'content_type', 'object_id', '-timestamp'],
+                name='notification_coalesce_idx'
+            ),
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notification_inbox_idx'),
+        ]
 
     def __str__(self):
         return f"{self.actor.username} {self.get_verb_display()} - {self.recipient.username}"
 
     def mark_as_read(self):
+        if self.read:
+            return
+        from .counters import adjust_counts, get_counts, is_unread
+        was_unread = is_unread(self, get_counts(self.recipient_id)['read_through'])
         self.read = True
-        self.save()
+        self.save(update_fields=['read'])
+        if was_unread:
+            adjust_counts({self.recipient_id: (0, -1)})
 
     @classmethod
     def create_notification(cls, recipient, actor, verb, target=None):
-        """Helper method to create notifications"""
-        notification = cls.objects.create(
-            recipient=recipient,
-            actor=actor,
-            verb=verb,
-            target=target
-        )
-        return notification
\ No newline at end of file
+        """Helper method to create notifications, coalescing repeats"""
+        from .services import notify
+        return notify(recipient, actor, verb, target)
+
+
+class NotificationEvent(models.Model):
+    """
+    Outbox row written in the same transaction as the user action that
+    caused it. The notification worker turns these into Notification rows
+    in batches and deletes them.
+    """
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    verb = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.actor_id} {self.verb} -> {self.recipient_id}"
+
+
+class NotificationCounter(models.Model):
+    """Per-user notification totals, so badge requests never count rows"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter'
+    )
+    total = models.PositiveIntegerField(default=0)
+    unread = models.PositiveIntegerField(default=0)
+    # Everything up to this instant counts as read, whatever its read flag
+    read_through = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread}/{self.total} unread"
+
+
+class NotificationArchive(models.Model):
+    """
+    Compact copy of a purged notification. Plain id columns instead of
+    foreign keys keep the table cheap to append to and independent of
+    the rows it refers to.
+    """
+    notification_id = models.BigIntegerField(unique=True)
+    recipient_id = models.BigIntegerField()
+    actor_id = models.BigIntegerField()
+    verb = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    content_type_id = models.IntegerField(null=True, blank=True)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient_id', '-timestamp'], name='notification_archive_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived notification {self.notification_id}"
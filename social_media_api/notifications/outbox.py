@@ -0,0 +1,205 @@
+"""
+Transactional notification outbox. Request handlers call enqueue(), which
+only inserts a NotificationEvent row; the run_notification_worker command
+drains events in batches, coalesces them and writes Notification rows
+with bulk_create.
+
+Worker threads split the outbox by recipient, so all events for one
+recipient are folded by the same thread and two batches never race to
+merge into, or create, the same notification.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Min
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from . import live
+from .counters import adjust_counts, delivery_timestamp, is_unread, read_through_map
+from .models import Notification, NotificationEvent
+from .services import actor_summary, coalesce_window, fold_actor
+
+
+def build_event(recipient, actor, verb, target=None, timestamp=None):
+    return NotificationEvent(
+        recipient_id=getattr(recipient, 'pk', recipient),
+        actor_id=getattr(actor, 'pk', actor),
+        verb=verb,
+        content_type=ContentType.objects.get_for_model(target) if target is not None else None,
+        object_id=target.pk if target is not None else None,
+        created_at=timestamp or timezone.now()
+    )
+
+
+def enqueue(recipient, actor, verb, target=None, timestamp=None):
+    """Append one notification event to the outbox"""
+    event = build_event(recipient, actor, verb, target, timestamp)
+    event.save()
+    return event
+
+
+def enqueue_many(events):
+    """Append already built events (see build_event) with one INSERT"""
+    return NotificationEvent.objects.bulk_create(events, batch_size=1000)
+
+
+class OutboxMetrics:
+    """Thread-safe counters kept by the workers of this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = 0
+        self.notifications_created = 0
+        self.notifications_merged = 0
+        self.batches = 0
+        self.last_batch_seconds = 0.0
+        self.last_lag_seconds = 0.0
+
+    def record(self, events, created, merged, seconds, lag):
+        with self.lock:
+            self.events += events
+            self.notifications_created += created
+            self.notifications_merged += merged
+            self.batches += 1
+            self.last_batch_seconds = seconds
+            self.last_lag_seconds = lag
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'events_processed': self.events,
+                'notifications_created': self.notifications_created,
+                'notifications_merged': self.notifications_merged,
+                'batches': self.batches,
+                'last_batch_seconds': round(self.last_batch_seconds, 4),
+                'last_lag_seconds': round(self.last_lag_seconds, 3),
+            }
+
+
+metrics = OutboxMetrics()
+
+
+def outbox_stats():
+    """Queue depth and the age of the oldest pending event"""
+    pending = NotificationEvent.objects.aggregate(oldest=Min('created_at'))['oldest']
+    lag = (timezone.now() - pending).total_seconds() if pending else 0.0
+    return {
+        'depth': NotificationEvent.objects.count(),
+        'lag_seconds': round(lag, 3),
+    }
+
+
+def event_key(event):
+    return (event.recipient_id, event.verb, event.content_type_id, event.object_id)
+
+
+def open_notifications(events, read_through):
+    """
+    Recent unread notifications that events of this batch may merge into,
+    locked until the batch commits
+    """
+    oldest = {}
+    for event in events:
+        window = coalesce_window(event.verb)
+        if window is not None:
+            since = event.created_at - window
+            oldest[event.verb] = min(oldest.get(event.verb, since), since)
+    if not oldest:
+        return {}
+
+    candidates = Notification.objects.filter(
+        recipient_id__in={event.recipient_id for event in events},
+        verb__in=list(oldest),
+        read=False,
+        timestamp__gte=min(oldest.values())
+    ).select_for_update(of=('self',)).select_related('actor').order_by('timestamp')
+    # Later rows overwrite earlier ones, leaving the newest per key
+    return {
+        (n.recipient_id, n.verb, n.content_type_id, n.object_id): n
+        for n in candidates
+        if is_unread(n, read_through.get(n.recipient_id))
+    }
+
+
+def apply_events(events):
+    """
+    Turn a batch of events into notifications: coalesce them with each
+    other and with open notifications, then write with one bulk_create and
+    one bulk_update. Returns (created, merged).
+    """
+    read_through = read_through_map({event.recipient_id for event in events}, lock=True)
+    existing = open_notifications(events, read_through)
+    created = []
+    changed = {}
+    changed_fields = defaultdict(set)
+
+    for event in events:
+        key = event_key(event)
+        window = coalesce_window(event.verb)
+        current = existing.get(key) if window is not None else None
+        if current is not None and event.created_at - current.timestamp <= window:
+            fields = fold_actor(current, event.actor, event.created_at)
+            if current.pk is not None:
+                changed[current.pk] = current
+                changed_fields[current.pk].update(fields)
+            continue
+
+        notification = Notification(
+            recipient_id=event.recipient_id,
+            actor=event.actor,
+            verb=event.verb,
+            content_type_id=event.content_type_id,
+            object_id=event.object_id,
+            timestamp=delivery_timestamp(event.created_at, read_through.get(event.recipient_id)),
+            recent_actors=[actor_summary(event.actor)]
+        )
+        created.append(notification)
+        if window is not None:
+            existing[key] = notification
+
+    Notification.objects.bulk_create(created)
+    totals = Counter(n.recipient_id for n in created)
+    unread = Counter(
+        n.recipient_id for n in created
+        if is_unread(n, read_through.get(n.recipient_id))
+    )
+    adjust_counts({
+        recipient_id: (count, unread[recipient_id])
+        for recipient_id, count in totals.items()
+    })
+    if changed:
+        fields = set().union(*changed_fields.values())
+        Notification.objects.bulk_update(list(changed.values()), sorted(fields))
+    live.publish_notifications(created + list(changed.values()))
+    return len(created), len(changed)
+
+
+def process_batch(batch_size=500, partition=None):
+    """
+    Drain up to batch_size events from the outbox; returns the number
+    handled. partition=(index, count) claims only the events whose
+    recipient_id % count == index.
+    """
+    started = time.monotonic()
+    pending = NotificationEvent.objects.all()
+    if partition is not None:
+        index, count = partition
+        pending = pending.annotate(shard=Mod('recipient_id', count)).filter(shard=index)
+    with transaction.atomic():
+        events = list(
+            pending.select_for_update(skip_locked=True, of=('self',))
+            .select_related('actor')
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+        created, merged = apply_events(events)
+        NotificationEvent.objects.filter(id__in=[event.id for event in events]).delete()
+
+    lag = (timezone.now() - events[0].created_at).total_seconds()
+    metrics.record(len(events), created, merged, time.monotonic() - started, lag)
+    return len(events)
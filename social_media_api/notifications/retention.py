@@ -0,0 +1,88 @@
+"""
+Retention policy for read notifications. Each verb keeps read
+notifications for a configurable number of days; older ones are moved to
+NotificationArchive or to gzipped JSONL files and removed from the hot
+table in bounded chunks.
+"""
+import gzip
+import json
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .counters import adjust_counts
+from .models import Notification, NotificationArchive
+
+DEFAULT_RETENTION_DAYS = 90
+
+ARCHIVE_FIELDS = (
+    'id', 'recipient_id', 'actor_id', 'verb', 'content_type_id',
+    'object_id', 'actor_count', 'timestamp',
+)
+
+
+def retention_days(verb):
+    policy = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', {})
+    return policy.get(verb, policy.get('default', DEFAULT_RETENTION_DAYS))
+
+
+def expired_notifications(verb, now=None):
+    """Read notifications of a verb that are older than its retention period"""
+    cutoff = (now or timezone.now()) - timezone.timedelta(days=retention_days(verb))
+    is_read = Q(read=True) | Q(timestamp__lte=F('recipient__notification_counter__read_through'))
+    return Notification.objects.filter(is_read, verb=verb, timestamp__lt=cutoff)
+
+
+def archive_to_table(rows):
+    NotificationArchive.objects.bulk_create(
+        [
+            NotificationArchive(
+                notification_id=row['id'],
+                recipient_id=row['recipient_id'],
+                actor_id=row['actor_id'],
+                verb=row['verb'],
+                content_type_id=row['content_type_id'],
+                object_id=row['object_id'],
+                actor_count=row['actor_count'],
+                timestamp=row['timestamp'],
+            )
+            for row in rows
+        ],
+        ignore_conflicts=True
+    )
+
+
+def archive_to_file(rows, directory, verb, sequence):
+    """Write one chunk as a gzipped JSONL file and return its path"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+    path = directory / f'notifications-{verb}-{stamp}-{sequence:05d}.jsonl.gz'
+    with gzip.open(path, 'wt', encoding='utf-8') as handle:
+        for row in rows:
+            handle.write(json.dumps({**row, 'timestamp': row['timestamp'].isoformat()}) + '\n')
+    return path
+
+
+def purge_chunk(queryset, chunk_size, archive=None):
+    """
+    Archive and delete up to chunk_size rows of queryset. `archive` is
+    called with the row dicts before they are deleted. Returns the rows.
+    """
+    with transaction.atomic():
+        rows = list(queryset.order_by('id').values(*ARCHIVE_FIELDS)[:chunk_size])
+        if not rows:
+            return rows
+        if archive is not None:
+            archive(rows)
+        Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        # Only read rows are purged, so just the totals change
+        adjust_counts({
+            recipient_id: (-count, 0)
+            for recipient_id, count in Counter(row['recipient_id'] for row in rows).items()
+        })
+    return rows
@@ -7,18 +7,52 @@ class NotificationSerializer(serializers.ModelSerializer):
     recipient_username = serializers.CharField(source='recipient.username', read_only=True)
     target_object = serializers.SerializerMethodField()
     verb_display = serializers.CharField(source='get_verb_display', read_only=True)
+    summary = serializers.SerializerMethodField()
+    read = serializers.SerializerMethodField()
+
+    VERB_PHRASES = {
+        Notification.FOLLOW: 'started following you',
+        Notification.LIKE: 'liked your post',
+        Notification.COMMENT: 'commented on your post',
+        Notification.MENTION: 'mentioned you',
+        Notification.SHARE: 'shared your post',
+    }
 
     class Meta:
         model = Notification
         fields = ('id', 'actor', 'actor_username', 'recipient', 'recipient_username',
-                 'verb', 'verb_display', 'read', 'timestamp', 'target', 'target_object')
-        read_only_fields = ('id', 'timestamp')
+                 'verb', 'verb_display', 'read', 'timestamp', 'target_object',
+                 'actor_count', 'recent_actors', 'summary')
+        read_only_fields = ('id', 'timestamp', 'actor_count', 'recent_actors')
+
+    def get_read(self, obj):
+        # Rows at or before the user's read watermark are read even if unflagged
+        read_through = self.context.get('read_through')
+        return obj.read or (read_through is not None and obj.timestamp <= read_through)
+
+    def get_summary(self, obj):
+        """Readable line such as 'alice and 41 others liked your post'"""
+        phrase = self.VERB_PHRASES.get(obj.verb, obj.get_verb_display())
+        others = obj.actor_count - 1
+        if others <= 0:
+            return f"{obj.actor.username} {phrase}"
+        noun = 'other' if others == 1 else 'others'
+        return f"{obj.actor.username} and {others} {noun} {phrase}"
 
     def get_target_object(self, obj):
+        # Targets are prefetched per content type by the list views
         if obj.target:
             # You can customize this based on your target models
             if hasattr(obj.target, 'title'):
                 return {'id': obj.target.id, 'title': obj.target.title}
             elif hasattr(obj.target, 'content'):
                 return {'id': obj.target.id, 'content': obj.target.content[:50]}
-        return None
\ No newline at end of file
+        return None
+
+class LiveNotificationSerializer(NotificationSerializer):
+    """Payload pushed to notification streams; needs no queries beyond the actor"""
+
+    class Meta(NotificationSerializer.Meta):
+        fields = ('id', 'actor', 'actor_username', 'recipient', 'verb', 'verb_display',
+                 'read', 'timestamp', 'content_type', 'object_id', 'actor_count',
+                 'recent_actors', 'summary')
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from . import live
+from .models import Notification
+from .counters import adjust_counts, delivery_timestamp, is_unread, read_through_map, unread_filter
+
+DEFAULT_COALESCE_WINDOWS = {
+    Notification.LIKE: 60 * 60,
+    Notification.FOLLOW: 60 * 60,
+    Notification.COMMENT: 15 * 60,
+}
+
+
+def coalesce_window(verb):
+    """How far back a new event may merge into an unread notification"""
+    windows = getattr(settings, 'NOTIFICATION_COALESCE_WINDOWS', DEFAULT_COALESCE_WINDOWS)
+    seconds = windows.get(verb)
+    return timedelta(seconds=seconds) if seconds else None
+
+
+def actor_sample_size():
+    return getattr(settings, 'NOTIFICATION_ACTOR_SAMPLE_SIZE', 3)
+
+
+def actor_summary(actor):
+    return {'id': actor.pk, 'username': actor.username}
+
+
+def fold_actor(notification, actor, timestamp):
+    """
+    Fold another actor into a coalesced notification in memory and return
+    the changed field names. Actors still in the sample are not counted
+    twice; the count is approximate beyond that.
+    """
+    sample = notification.recent_actors or [actor_summary(notification.actor)]
+    notification.timestamp = max(notification.timestamp, timestamp)
+    if any(entry['id'] == actor.pk for entry in sample):
+        return ['timestamp']
+
+    notification.actor = actor
+    notification.actor_count += 1
+    notification.recent_actors = [actor_summary(actor)] + sample[:actor_sample_size() - 1]
+    return ['actor', 'actor_count', 'recent_actors', 'timestamp']
+
+
+def merge_actor(notification, actor, timestamp):
+    notification.save(update_fields=fold_actor(notification, actor, timestamp))
+    return notification
+
+
+def notify(recipient, actor, verb, target=None, timestamp=None):
+    """
+    Record that `actor` did `verb` for `recipient`. Verbs with a coalesce
+    window merge into a recent unread notification for the same target
+    ("alice and 41 others liked your post") instead of adding a row.
+    """
+    timestamp = timestamp or timezone.now()
+    recipient_id = getattr(recipient, 'pk', recipient)
+    content_type = ContentType.objects.get_for_model(target) if target is not None else None
+    object_id = target.pk if target is not None else None
+
+    read_through = read_through_map([recipient_id]).get(recipient_id)
+
+    window = coalesce_window(verb)
+    if window is not None:
+        with transaction.atomic():
+            existing = (
+                Notification.objects.select_for_update()
+                .filter(
+                    unread_filter(read_through),
+                    recipient_id=recipient_id,
+                    verb=verb,
+                    content_type=content_type,
+                    object_id=object_id,
+                    timestamp__gte=timestamp - window
+                )
+                .order_by('-timestamp')
+                .first()
+            )
+            if existing is not None:
+                merge_actor(existing, actor, timestamp)
+                live.publish_notifications([existing])
+                return existing
+
+    notification = Notification.objects.create(
+        recipient_id=recipient_id,
+        actor=actor,
+        verb=verb,
+        content_type=content_type,
+        object_id=object_id,
+        timestamp=delivery_timestamp(timestamp, read_through),
+        recent_actors=[actor_summary(actor)]
+    )
+    adjust_counts({recipient_id: (1, int(is_unread(notification, read_through)))})
+    live.publish_notifications([notification])
+    return notification
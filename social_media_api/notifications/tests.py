@@ -1,3 +1,109 @@
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from posts.models import Post
+from . import outbox
+from .counters import delivery_timestamp, get_counts, mark_all_read
+from .models import Notification, NotificationCounter
+
+
+class DeliveryTimestampTests(TestCase):
+    def test_event_after_watermark_keeps_its_time(self):
+        watermark = timezone.now()
+        later = watermark + timedelta(seconds=5)
+        self.assertEqual(delivery_timestamp(later, watermark), later)
+        self.assertEqual(delivery_timestamp(later, None), later)
+
+    def test_event_before_watermark_moves_past_it(self):
+        watermark = timezone.now() + timedelta(minutes=1)
+        earlier = watermark - timedelta(minutes=5)
+        self.assertGreater(delivery_timestamp(earlier, watermark), watermark)
+
+
+class OutboxDeliveryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = CustomUser.objects.create_user('author', password='x')
+        self.fans = [CustomUser.objects.create_user(f'fan{i}', password='x') for i in range(3)]
+        self.post = Post.objects.create(author=self.author, title='t', content='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def like(self, fan):
+        outbox.enqueue(self.author, fan, Notification.LIKE, self.post)
+
+    def deliver(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return outbox.process_batch()
+
+    def counts(self):
+        counts = get_counts(self.author.id)
+        return counts['total'], counts['unread']
+
+    def test_events_of_one_batch_coalesce(self):
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        self.assertEqual(self.deliver(), 2)
+
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.actor, self.fans[1])
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_later_batch_merges_into_open_notification(self):
+        self.like(self.fans[0])
+        self.deliver()
+        self.like(self.fans[1])
+        self.like(self.fans[0])
+        self.deliver()
+
+        notification = Notification.objects.get(recipient=self.author)
+        # A repeat actor is not counted twice
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(
+            [entry['id'] for entry in notification.recent_actors],
+            [self.fans[1].id, self.fans[0].id]
+        )
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_read_notifications_are_not_merged_into(self):
+        self.like(self.fans[0])
+        self.deliver()
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_all_read(self.author.id)
+        self.like(self.fans[1])
+        self.deliver()
+
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 2)
+        self.assertEqual(self.counts(), (2, 1))
+
+    def test_event_delivered_after_mark_all_read_stays_unread(self):
+        self.like(self.fans[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_all_read(self.author.id)
+        self.deliver()
+
+        notification = Notification.objects.get(recipient=self.author)
+        read_through = NotificationCounter.objects.get(user=self.author).read_through
+        self.assertGreater(notification.timestamp, read_through)
+        self.assertEqual(self.counts(), (1, 1))
+
+        unread = self.client.get('/api/notifications/unread/').json()['results']
+        self.assertEqual([row['id'] for row in unread], [notification.id])
+        self.assertFalse(unread[0]['read'])
+
+    def test_stats_endpoint_follows_the_counters(self):
+        self.like(self.fans[0])
+        self.deliver()
+        stats = self.client.get('/api/notifications/stats/').json()
+        self.assertEqual((stats['total_notifications'], stats['unread_notifications']), (1, 1))
 
-# Create your tests here.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/notifications/read-all/')
+        stats = self.client.get('/api/notifications/stats/').json()
+        self.assertEqual((stats['unread_notifications'], stats['read_notifications']), (0, 1))
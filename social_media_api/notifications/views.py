@@ -1,4 +1,13 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_GET
+from rest_framework.authtoken.models import Token
 
 # Create your views here.
 from rest_framework import generics, permissions, status
@@ -6,22 +15,55 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from .models import Notification
+from . import live, outbox
+from .counters import get_counts, mark_all_read, unread_filter
 from .serializers import NotificationSerializer
+from social_media_api.pagination import KeysetPagination
 from django.db.models import Q
 
-class NotificationListView(generics.ListAPIView):
+class ReadWatermarkMixin:
+    """Shares the user's read_through watermark with the serializer"""
+
+    def get_read_through(self):
+        if not hasattr(self, '_read_through'):
+            self._read_through = get_counts(self.request.user.id)['read_through']
+        return self._read_through
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['read_through'] = self.get_read_through()
+        return context
+
+class NotificationPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+    page_size = 20
+
+def notification_page_queryset(queryset):
+    """Join actors and recipients and load targets with one query per content type"""
+    return queryset.select_related('actor', 'recipient').prefetch_related('target')
+
+class NotificationListView(ReadWatermarkMixin, generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        return notification_page_queryset(
+            Notification.objects.filter(recipient=self.request.user)
+        )
 
-class UnreadNotificationListView(generics.ListAPIView):
+class UnreadNotificationListView(ReadWatermarkMixin, generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user, read=False)
+        return notification_page_queryset(
+            Notification.objects.filter(
+                unread_filter(self.get_read_through()),
+                recipient=self.request.user
+            )
+        )
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -33,18 +75,114 @@ def mark_notification_read(request, notification_id):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def mark_all_notifications_read(request):
-    notifications = Notification.objects.filter(recipient=request.user, read=False)
-    notifications.update(read=True)
-    return Response({'message': f'Marked {notifications.count()} notifications as read'})
+    # Moves the read watermark; fold_read_watermarks updates the rows later
+    unread = get_counts(request.user.id)['unread']
+    mark_all_read(request.user.id)
+    return Response({'message': f'Marked {unread} notifications as read'})
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def notification_stats(request):
-    total = Notification.objects.filter(recipient=request.user).count()
-    unread = Notification.objects.filter(recipient=request.user, read=False).count()
+    # Served from the per-user counter, not by counting notifications
+    counts = get_counts(request.user.id)
+    total = counts['total']
+    unread = counts['unread']
     
     return Response({
         'total_notifications': total,
         'unread_notifications': unread,
         'read_notifications': total - unread
-    })
\ No newline at end of file
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def outbox_stats(request):
+    """
+    Queue depth and lag of the notification outbox. Worker throughput is
+    reported by run_notification_worker itself, in its own process.
+    """
+    return Response({
+        **outbox.outbox_stats(),
+        'streams': live.broker.connection_count()
+    })
+
+
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def stream_user(request):
+    """
+    The user of a stream request, from its token or session. EventSource
+    cannot send headers, so the token may also come as ?token=.
+    """
+    header = request.headers.get('Authorization', '')
+    key = header[6:].strip() if header.startswith('Token ') else request.GET.get('token')
+    if key:
+        token = await Token.objects.select_related('user').filter(key=key).afirst()
+        user = token.user if token is not None else None
+    else:
+        user = await request.auser()
+    if user is None or not user.is_authenticated or not user.is_active:
+        return None
+    return user
+
+
+async def notification_events(user_id):
+    """
+    Yield server-sent events for one user: the badge counts on connect,
+    then every published notification and count change. The counts are
+    re-read on a heartbeat only when messages may have been missed: while
+    the Redis listener is down or after it reconnected, and always when no
+    Redis channel is configured.
+    """
+    heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 20)
+    # Count reads run in the shared executor, not the single thread that
+    # thread-sensitive calls queue on
+    read_counts = sync_to_async(get_counts, thread_sensitive=False)
+    subscription = live.broker.subscribe(user_id)
+    live.listener.ensure_started()
+    try:
+        generation = live.listener.generation
+        counts = live.count_payload(await read_counts(user_id))
+        yield f"retry: {heartbeat * 1000}\n" + sse_message('counts', counts)
+        while True:
+            try:
+                event, data = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                if live.listener.connected and live.listener.generation == generation:
+                    yield ": keepalive\n\n"
+                    continue
+                generation = live.listener.generation
+                latest = live.count_payload(await read_counts(user_id))
+                if latest == counts:
+                    yield ": keepalive\n\n"
+                    continue
+                event, data = 'counts', latest
+            if event == 'counts':
+                if data == counts:
+                    continue
+                counts = data
+            yield sse_message(event, data)
+    finally:
+        live.broker.unsubscribe(subscription)
+
+
+@require_GET
+async def notification_stream(request):
+    """
+    Live notifications as server-sent events. Serve this through asgi.py:
+    an idle stream is then a suspended coroutine instead of a worker thread.
+    """
+    user = await stream_user(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    response = StreamingHttpResponse(notification_events(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
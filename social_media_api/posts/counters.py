@@ -0,0 +1,16 @@
+from django.db.models import F
+
+from .models import Post
+
+
+def adjust_counter(post_id, field, delta):
+    """Atomically add `delta` to one of a post's denormalized counters"""
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        # Never drive a counter below zero if it has already drifted
+        posts = posts.filter(**{f'{field}__gte': -delta})
+    return posts.update(**{field: F(field) + delta})
+
+
+def adjust_comment_count(post_id, delta):
+    return adjust_counter(post_id, 'comment_count', delta)
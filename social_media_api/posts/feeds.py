@@ -0,0 +1,111 @@
+import heapq
+from itertools import islice
+
+from accounts.graph import contains, follow_graph
+from social_media_api.pagination import keyset_filter
+from .models import Post, TimelineEntry
+from .timeline import pulled_author_ids
+from .trending import trending_queryset
+
+
+def stream_keys(queryset, key_fields, position, batch_size):
+    """
+    Lazily yield (created_at, post_id) keys of a queryset, newest first,
+    reading `batch_size` rows at a time after the last key seen.
+    """
+    ordering = tuple('-' + name for name in key_fields)
+    while True:
+        batch = list(
+            keyset_filter(queryset, ordering, position)
+            .values_list(*key_fields)[:batch_size]
+        )
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        position = batch[-1]
+
+
+class CandidateSource:
+    """
+    A stream of feed candidates as (created_at, post_id) keys in
+    descending order. Sources read lazily, so merging them never pulls
+    more than a batch from each.
+    """
+
+    def keys(self, position, batch_size):
+        raise NotImplementedError
+
+
+class TimelineSource(CandidateSource):
+    """Posts fanned out into the user's materialized timeline"""
+
+    def __init__(self, user):
+        self.user = user
+
+    def keys(self, position, batch_size):
+        entries = TimelineEntry.objects.filter(owner=self.user)
+        return stream_keys(entries, ('created_at', 'post_id'), position, batch_size)
+
+
+class PulledAuthorsSource(CandidateSource):
+    """Posts by followed authors too popular to fan out on write"""
+
+    def __init__(self, user):
+        self.author_ids = pulled_author_ids(user)
+
+    def keys(self, position, batch_size):
+        if not self.author_ids:
+            return iter(())
+        posts = Post.objects.filter(author_id__in=self.author_ids)
+        return stream_keys(posts, ('created_at', 'id'), position, batch_size)
+
+
+class PopularSource(CandidateSource):
+    """The top trending posts from authors the user does not follow"""
+
+    def __init__(self, user, limit=10, window=5):
+        self.user = user
+        self.limit = limit
+        # Followed authors are dropped in memory from the top limit * window posts
+        self.window = window
+
+    def keys(self, position, batch_size):
+        following = follow_graph.following_ids(self.user.pk)
+        candidates = trending_queryset().values_list('created_at', 'id', 'author_id')
+        popular = [
+            (created_at, post_id)
+            for created_at, post_id, author_id in candidates[:self.limit * self.window]
+            if not contains(following, author_id)
+        ][:self.limit]
+        return (key for key in sorted(popular, reverse=True) if position is None or key < position)
+
+
+def merge_sources(sources, position, count):
+    """
+    Merge candidate sources with a bounded heap and return the first
+    `count` distinct posts after `position`, newest first.
+    """
+    streams = [source.keys(position, count) for source in sources]
+    seen = set()
+    unique_ids = (
+        post_id for _, post_id in heapq.merge(*streams, reverse=True)
+        if not (post_id in seen or seen.add(post_id))
+    )
+    page_ids = list(islice(unique_ids, count))
+
+    posts = Post.objects.select_related('author').in_bulk(page_ids)
+    return [posts[post_id] for post_id in page_ids if post_id in posts]
+
+
+def home_timeline(user, position, count):
+    """
+    Return up to `count` posts of the user's home timeline that sort after
+    `position`, a (created_at, id) keyset or None for the first page.
+    """
+    return merge_sources([TimelineSource(user), PulledAuthorsSource(user)], position, count)
+
+
+def personalized_timeline(user, position, count):
+    """The home timeline with popular posts from outside the user's network"""
+    sources = [TimelineSource(user), PulledAuthorsSource(user), PopularSource(user)]
+    return merge_sources(sources, position, count)
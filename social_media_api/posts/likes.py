@@ -0,0 +1,83 @@
+"""
+Like service. Every like and unlike goes through here so that each one
+costs a fixed number of statements: a conflict-tolerant INSERT or a plain
+DELETE, one UPDATE of the post's counter and trending score, and a
+notification on a new like. Like has no model signals; code that deletes
+Like rows some other way should follow up with reconcile_post_counters.
+"""
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Value
+from django.utils import timezone
+
+from notifications.models import Notification
+from notifications.outbox import enqueue
+from .models import Like, Post
+from . import trending
+
+
+def _insert_like(user, post, created_at):
+    """INSERT ... ON CONFLICT DO NOTHING; returns the new row id or None"""
+    meta = Like._meta
+    qn = connection.ops.quote_name
+    columns = [meta.get_field(name).column for name in ('user', 'post', 'created_at')]
+    created_at = meta.get_field('created_at').get_db_prep_value(created_at, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(column) for column in columns)}) "
+            f"VALUES (%s, %s, %s) "
+            f"ON CONFLICT ({qn(columns[0])}, {qn(columns[1])}) DO NOTHING "
+            f"RETURNING {qn(meta.pk.column)}",
+            [user.pk, post.pk, created_at]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _read_like_count(post):
+    return Post.objects.filter(pk=post.pk).values_list('like_count', flat=True).first() or 0
+
+
+def like_post(user, post):
+    """
+    Like a post if the user has not already. Returns (like, like_count),
+    where like is None when the post was already liked.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        like_id = _insert_like(user, post, now)
+        if like_id is None:
+            return None, _read_like_count(post)
+
+        score = Value(trending.event_score(trending.LIKE, now), output_field=FloatField())
+        Post.objects.filter(pk=post.pk).update(
+            like_count=F('like_count') + 1,
+            trending_score=trending.log_add(F('trending_score'), score)
+        )
+        if post.author_id != user.pk:
+            enqueue(post.author_id, user, Notification.LIKE, post, now)
+        like_count = _read_like_count(post)
+
+    like = Like(id=like_id, user=user, post=post, created_at=now)
+    return like, like_count
+
+
+def unlike_post(user, post):
+    """Remove the user's like if there is one. Returns (removed, like_count)"""
+    with transaction.atomic():
+        # Like has no signals or dependents, so this is a single DELETE
+        removed, _ = Like.objects.filter(user=user, post=post).delete()
+        if removed:
+            Post.objects.filter(pk=post.pk, like_count__gte=removed).update(
+                like_count=F('like_count') - removed
+            )
+        like_count = _read_like_count(post)
+    return bool(removed), like_count
+
+
+def toggle_like(user, post):
+    """Like the post, or unlike it if already liked. Returns (liked, like_count)"""
+    like, like_count = like_post(user, post)
+    if like is not None:
+        return True, like_count
+    _, like_count = unlike_post(user, post)
+    return False, like_count
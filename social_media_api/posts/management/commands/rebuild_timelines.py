@@ -0,0 +1,49 @@
+from itertools import groupby
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import TimelineEntry
+from posts.timeline import backfill_from_authors
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized home timelines from the follow graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Only rebuild the timeline of this user id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        # Rows of the followers M2M: from_customuser is followed by to_customuser
+        Follow = get_user_model().followers.through
+        follows = Follow.objects.all()
+        stale = TimelineEntry.objects.all()
+        user_ids = options['user_ids']
+        if user_ids:
+            follows = follows.filter(to_customuser_id__in=user_ids)
+            stale = stale.filter(owner_id__in=user_ids)
+
+        pairs = (
+            follows.order_by('to_customuser_id', 'from_customuser_id')
+            .values_list('to_customuser_id', 'from_customuser_id')
+        )
+        owners = edges = 0
+        for follower_id, group in groupby(pairs.iterator(), key=lambda pair: pair[0]):
+            author_ids = [author_id for _, author_id in group]
+            # Each timeline is swapped in one transaction, so readers never see it empty
+            with transaction.atomic():
+                TimelineEntry.objects.filter(owner_id=follower_id).delete()
+                backfill_from_authors(follower_id, author_ids)
+            owners += 1
+            edges += len(author_ids)
+
+        # Timelines of users who no longer follow anyone
+        stale.exclude(owner_id__in=Follow.objects.values('to_customuser_id')).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {owners} timelines from {edges} follow relationships'
+        ))
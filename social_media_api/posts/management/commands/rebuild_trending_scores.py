@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Like, Post
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending scores from recent likes and comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=7,
+            help='Only rescore posts created in the last N days (default: 7)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of posts rescored per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timezone.timedelta(days=options['days'])
+        post_ids = Post.objects.filter(created_at__gte=since).values_list('id', flat=True)
+        chunk_size = options['chunk_size']
+
+        chunk = []
+        total = 0
+        for post_id in post_ids.iterator(chunk_size=chunk_size):
+            chunk.append(post_id)
+            if len(chunk) == chunk_size:
+                total += self.rescore(chunk)
+                chunk = []
+        if chunk:
+            total += self.rescore(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'Rescored {total} posts'))
+
+    def rescore(self, post_ids):
+        events = {post_id: [] for post_id in post_ids}
+        likes = Like.objects.filter(post_id__in=post_ids).values_list('post_id', 'created_at')
+        for post_id, created_at in likes.iterator():
+            events[post_id].append(trending.event_score(trending.LIKE, created_at))
+        comments = Comment.objects.filter(post_id__in=post_ids).values_list('post_id', 'created_at')
+        for post_id, created_at in comments.iterator():
+            events[post_id].append(trending.event_score(trending.COMMENT, created_at))
+
+        posts = [
+            Post(id=post_id, trending_score=trending.combine_scores(scores))
+            for post_id, scores in events.items()
+        ]
+        Post.objects.bulk_update(posts, ['trending_score'])
+        return len(posts)
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from posts.models import Comment, Like, Post
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in the denormalized like_count and comment_count columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of posts checked per batch (default: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drift without writing corrections'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        checked = repaired = 0
+        last_id = 0
+
+        while True:
+            posts = list(
+                Post.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'like_count', 'comment_count')[:chunk_size]
+            )
+            if not posts:
+                break
+            last_id = posts[-1].id
+            checked += len(posts)
+
+            post_ids = [post.id for post in posts]
+            like_counts = self.count_by_post(Like, post_ids)
+            comment_counts = self.count_by_post(Comment, post_ids)
+
+            drifted = []
+            for post in posts:
+                like_count = like_counts.get(post.id, 0)
+                comment_count = comment_counts.get(post.id, 0)
+                if (post.like_count, post.comment_count) != (like_count, comment_count):
+                    post.like_count = like_count
+                    post.comment_count = comment_count
+                    drifted.append(post)
+
+            repaired += len(drifted)
+            if drifted and not options['dry_run']:
+                Post.objects.bulk_update(drifted, ['like_count', 'comment_count'])
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {repaired} drifted posts out of {checked} checked'
+        ))
+
+    def count_by_post(self, model, post_ids):
+        rows = (
+            model.objects.filter(post_id__in=post_ids)
+            .order_by()
+            .values('post_id')
+            .annotate(total=Count('id'))
+            .values_list('post_id', 'total')
+        )
+        return dict(rows)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+    ]
@@ -20,6 +20,11 @@ class Post(models.Model):
         related_name='liked_posts',
         blank=True
     )
+    # Time-decayed engagement score kept in log space, see posts/trending.py
+    trending_score = models.FloatField(default=0, db_index=True)
+    # Denormalized counters, see posts/counters.py
+    like_count = models.PositiveIntegerField(default=0, db_index=True)
+    comment_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ['-created_at']
@@ -27,14 +32,6 @@ class Post(models.Model):
     def __str__(self):
         return f"{self.title} by {self.author.username}"
 
-    @property
-    def like_count(self):
-        return self.likes.count()
-
-    @property
-    def comment_count(self):
-        return self.comments.count()
-
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -52,6 +49,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Serves the keyset-paginated thread: WHERE post_id = %s ORDER BY created_at, id
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_thread_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
@@ -77,16 +78,33 @@ class Like(models.Model):
     def __str__(self):
         return f"{self.user.username} likes {self.post.title}"
 
-class Post(models.Model):
-    # ... existing Post fields ...
-    
-    @property
-    def like_count(self):
-        return self.likes_received.count()
 
-    @property
-    def is_liked_by_user(self, user):
-        if user.is_authenticated:
-            return self.likes_received.filter(user=user).exists()
-        return False
+class TimelineEntry(models.Model):
+    """A post pushed into a follower's materialized home timeline"""
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    # Copy of post.created_at so a timeline page is read from one index
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['owner', 'post']
+        ordering = ['-created_at', '-post']
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-post'], name='timeline_owner_recent_idx'),
+        ]
 
+    def __str__(self):
+        return f"{self.post_id} in timeline of {self.owner_id}"
@@ -1,7 +1,18 @@
 from rest_framework import serializers
+from django.db import models
 from .models import Post, Comment, Like
 from django.contrib.auth import get_user_model
 
+
+def get_liked_post_ids(user, posts):
+    """Return the ids among `posts` that `user` has liked, in one query"""
+    if not user or not user.is_authenticated:
+        return set()
+    post_ids = [post.id for post in posts]
+    return set(
+        Like.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)
+    )
+
 class SimpleUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
@@ -12,39 +23,23 @@ class CommentSerializer(serializers.ModelSerializer):
     author_id = serializers.PrimaryKeyRelatedField(
         queryset=get_user_model().objects.all(),
         source='author',
-        write_only=True
+        write_only=True,
+        required=False
     )
 
     class Meta:
         model = Comment
         fields = ('id', 'post', 'author', 'author_id', 'content', 
                  'created_at', 'updated_at')
-        read_only_fields = ('id', 'created_at', 'updated_at')
+        # The post comes from the URL and the author from the request
+        read_only_fields = ('id', 'post', 'created_at', 'updated_at')
 
-class PostSerializer(serializers.ModelSerializer):
-    author = SimpleUserSerializer(read_only=True)
-    author_id = serializers.PrimaryKeyRelatedField(
-        queryset=get_user_model().objects.all(),
-        source='author',
-        write_only=True
-    )
-    comments = CommentSerializer(many=True, read_only=True)
-    like_count = serializers.ReadOnlyField()
-    comment_count = serializers.ReadOnlyField()
-    is_liked = serializers.SerializerMethodField()
+# Comments nested in a post; the rest are paged from /posts/{id}/comments/
+COMMENT_PREVIEW_SIZE = 20
 
-    class Meta:
-        model = Post
-        fields = ('id', 'author', 'author_id', 'title', 'content',
-                 'created_at', 'updated_at', 'like_count', 'comment_count',
-                 'comments', 'is_liked', 'likes')
-        read_only_fields = ('id', 'created_at', 'updated_at', 'likes')
-
-    def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(id=request.user.id).exists()
-        return False
+def comment_preview(post):
+    """The first page of a post's comments with their authors joined"""
+    return post.comments.select_related('author').order_by('created_at', 'id')[:COMMENT_PREVIEW_SIZE]
 
 class PostCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -59,30 +54,118 @@ class LikeSerializer(serializers.ModelSerializer):
         fields = ('id', 'user', 'post', 'created_at')
         read_only_fields = ('id', 'created_at')
 
-# ... existing serializers ...
+def parse_field_list(value):
+    """Split a comma separated query parameter into a set of names"""
+    if not value:
+        return set()
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+class SparseFieldsMixin:
+    """
+    Lets clients shape responses with query parameters: ?fields=id,title
+    keeps only the named fields and ?expand=comments adds the nested
+    collections listed in expandable_fields.
+    """
+    expandable_fields = {}
+
+    def get_requested(self, param):
+        request = self.context.get('request')
+        if request is None:
+            return set()
+        return parse_field_list(request.query_params.get(param))
+
+    @property
+    def expanded_fields(self):
+        return self.get_requested('expand') & set(self.expandable_fields)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.expanded_fields:
+            fields[name] = self.expandable_fields[name]()
+        only = self.get_requested('fields')
+        if only:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in only or field.write_only
+            }
+        return fields
 
-class PostSerializer(serializers.ModelSerializer):
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Resolves the current user's likes for a whole page of posts at once and
+    shares them with each child through the 'liked_post_ids' context key.
+    Nested collections requested with ?expand= are prefetched for the page.
+    """
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'liked_post_ids' not in self.context:
+            request = self.context.get('request')
+            user = request.user if request else None
+            self.context['liked_post_ids'] = get_liked_post_ids(user, posts)
+        lookups = [self.child.expandable_prefetches[name] for name in self.child.expanded_fields]
+        if lookups:
+            models.prefetch_related_objects(posts, *lookups)
+        return super().to_representation(posts)
+
+class PostSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact post representation for lists: counts but no nested comments
+    or likes unless asked for with ?expand=comments,likes.
+    """
     author = SimpleUserSerializer(read_only=True)
     author_id = serializers.PrimaryKeyRelatedField(
         queryset=get_user_model().objects.all(),
         source='author',
         write_only=True
     )
-    comments = CommentSerializer(many=True, read_only=True)
     like_count = serializers.ReadOnlyField()
     comment_count = serializers.ReadOnlyField()
     is_liked = serializers.SerializerMethodField()
-    likes = LikeSerializer(many=True, read_only=True)
+
+    expandable_fields = {
+        'comments': lambda: CommentSerializer(source='preview_comments', many=True, read_only=True),
+        'likes': lambda: LikeSerializer(source='likes_received', many=True, read_only=True),
+    }
+    expandable_prefetches = {
+        # A sliced Prefetch bounds each post to its first page of comments
+        'comments': models.Prefetch(
+            'comments',
+            queryset=Comment.objects.select_related('author')
+            .order_by('created_at', 'id')[:COMMENT_PREVIEW_SIZE],
+            to_attr='preview_comments'
+        ),
+        'likes': 'likes_received__user',
+    }
 
     class Meta:
         model = Post
         fields = ('id', 'author', 'author_id', 'title', 'content',
                  'created_at', 'updated_at', 'like_count', 'comment_count',
-                 'comments', 'is_liked', 'likes')
-        read_only_fields = ('id', 'created_at', 'updated_at', 'likes')
+                 'is_liked')
+        read_only_fields = ('id', 'created_at', 'updated_at')
+        list_serializer_class = PostListSerializer
 
     def get_is_liked(self, obj):
+        liked_post_ids = self.context.get('liked_post_ids')
+        if liked_post_ids is not None:
+            return obj.id in liked_post_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes_received.filter(user=request.user).exists()
-        return False
\ No newline at end of file
+        return False
+
+class PostSerializer(PostSummarySerializer):
+    """Full post representation with its first comments and likes nested"""
+    comments = serializers.SerializerMethodField()
+    likes = LikeSerializer(source='likes_received', many=True, read_only=True)
+
+    # Both collections are always nested here; ?expand= must not replace
+    # the comment preview with the list view's prefetched attribute
+    expandable_fields = {}
+
+    class Meta(PostSummarySerializer.Meta):
+        fields = PostSummarySerializer.Meta.fields + ('comments', 'likes')
+
+    def get_comments(self, obj):
+        return CommentSerializer(comment_preview(obj), many=True, context=self.context).data
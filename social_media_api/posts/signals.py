@@ -1,24 +1,64 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from django.contrib.auth import get_user_model
 from notifications.models import Notification
-from .models import Like, Comment
-
-@receiver(post_save, sender=Like)
-def create_like_notification(sender, instance, created, **kwargs):
-    if created and instance.post.author != instance.user:
-        Notification.create_notification(
-            recipient=instance.post.author,
-            actor=instance.user,
-            verb=Notification.LIKE,
-            target=instance.post
-        )
+from notifications.outbox import enqueue
+from .models import Comment, TimelineEntry
+from .timeline import backfill_from_authors, purge_authors
+from . import trending
+from .counters import adjust_comment_count
+
+# Likes are written through posts/likes.py, which maintains their counter,
+# trending score and notification itself.
 
 @receiver(post_save, sender=Comment)
 def create_comment_notification(sender, instance, created, **kwargs):
-    if created and instance.post.author != instance.author:
-        Notification.create_notification(
-            recipient=instance.post.author,
-            actor=instance.author,
+    if created and instance.post.author_id != instance.author_id:
+        # Delivered by the notification worker, see notifications/outbox.py
+        enqueue(
+            recipient=instance.post.author_id,
+            actor=instance.author_id,
             verb=Notification.COMMENT,
             target=instance.post
-        )
\ No newline at end of file
+        )
+
+@receiver(post_save, sender=Comment)
+def update_trending_on_comment(sender, instance, created, **kwargs):
+    if created:
+        trending.record_engagement(instance.post_id, trending.COMMENT, instance.created_at)
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_comment_count(instance.post_id, 1)
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    adjust_comment_count(instance.post_id, -1)
+
+
+@receiver(m2m_changed, sender=get_user_model().followers.through)
+def sync_timeline_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep materialized timelines in step with follow/unfollow"""
+    if action == 'post_clear':
+        if reverse:
+            # instance stopped following everyone
+            TimelineEntry.objects.filter(owner_id=instance.pk).delete()
+        else:
+            # Everyone stopped following instance
+            TimelineEntry.objects.filter(author_id=instance.pk).exclude(owner_id=instance.pk).delete()
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    # Forward side: instance is the followed user, pk_set are followers
+    if reverse:
+        changes = {instance.pk: pk_set}
+    else:
+        changes = {follower_id: [instance.pk] for follower_id in pk_set}
+
+    for follower_id, author_ids in changes.items():
+        if action == 'post_add':
+            backfill_from_authors(follower_id, author_ids)
+        else:
+            purge_authors(follower_id, author_ids)
@@ -1,3 +1,63 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import CustomUser
+from social_media_api.pagination import KeysetPagination
+from .models import Comment, Post
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.reader = CustomUser.objects.create_user('reader', password='x')
+        self.author = CustomUser.objects.create_user('author', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def walk(self, url, key):
+        """Follow next links from url and return every row's id in page order"""
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            data = response.json()
+            seen += [row['id'] for row in data[key]]
+            url = data['next']
+        return seen
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPagination()
+        position = (timezone.now(), 42)
+        request = Request(RequestFactory().get('/', {'cursor': paginator.encode_cursor(position)}))
+        self.assertEqual(paginator.decode_cursor(request, Post), position)
+
+    def test_walk_visits_every_post_once_across_timestamp_ties(self):
+        posts = [
+            Post.objects.create(author=self.author, title=f'p{i}', content='x')
+            for i in range(7)
+        ]
+        # Rows sharing created_at are told apart by id
+        tied = timezone.now()
+        Post.objects.filter(id__in=[post.id for post in posts[2:5]]).update(created_at=tied)
+
+        expected = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/feed/explore/?page_size=2', 'posts'), expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/feed/?cursor=not-a-cursor').status_code, 404)
+
+    def test_comment_pages_read_forward(self):
+        post = Post.objects.create(author=self.author, title='t', content='x')
+        comments = [
+            Comment.objects.create(post=post, author=self.reader, content=f'c{i}')
+            for i in range(5)
+        ]
+
+        seen = []
+        url = f'/api/posts/{post.id}/comments/?page_size=2'
+        while url:
+            data = self.client.get(url).json()
+            seen += [comment['id'] for comment in data['results']]
+            url = data['next']
+        self.assertEqual(seen, [comment.id for comment in comments])
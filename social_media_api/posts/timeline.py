@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Post, TimelineEntry
+
+
+def fanout_max_followers():
+    """Follower count above which an author's posts are pulled at read time"""
+    return getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 10000)
+
+
+def fan_out_post(post):
+    """
+    Push a new post into the home timeline of every follower of its author.
+    Authors with more followers than FEED_FANOUT_MAX_FOLLOWERS are skipped;
+    their posts are merged in when a follower reads the timeline.
+    """
+    author = post.author
+    if author.follower_count > fanout_max_followers():
+        return 0
+
+    follower_ids = author.followers.values_list('id', flat=True)
+    entries = [
+        TimelineEntry(
+            owner_id=follower_id,
+            post=post,
+            author_id=post.author_id,
+            created_at=post.created_at
+        )
+        for follower_id in follower_ids.iterator()
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+    return len(entries)
+
+
+def backfill_from_authors(follower_id, author_ids):
+    """
+    Copy the recent posts of several newly followed authors into a
+    timeline with one query, ranking posts per author with a window.
+    """
+    limit = getattr(settings, 'FEED_BACKFILL_POSTS', 50)
+    posts = (
+        Post.objects.filter(author_id__in=author_ids)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=F('author_id'),
+            order_by=[F('created_at').desc(), F('id').desc()]
+        ))
+        .filter(rank__lte=limit)
+    )
+    entries = [
+        TimelineEntry(
+            owner_id=follower_id,
+            post_id=post_id,
+            author_id=author_id,
+            created_at=created_at
+        )
+        for post_id, author_id, created_at in posts.values_list('id', 'author_id', 'created_at')
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+
+def purge_authors(follower_id, author_ids):
+    """Remove the posts of several unfollowed authors from a timeline"""
+    TimelineEntry.objects.filter(owner_id=follower_id, author_id__in=author_ids).delete()
+
+
+def pulled_author_ids(user):
+    """Followed authors whose posts are not fanned out on write"""
+    return list(
+        user.following.filter(follower_count__gt=fanout_max_followers())
+        .values_list('id', flat=True)
+    )
@@ -0,0 +1,78 @@
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import Post
+
+# Scores are measured from this instant; only differences matter
+SCORE_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+LIKE = 'like'
+COMMENT = 'comment'
+
+DEFAULT_WEIGHTS = {
+    LIKE: 1.0,
+    COMMENT: 2.0,
+}
+
+
+def event_weight(kind):
+    weights = getattr(settings, 'TRENDING_WEIGHTS', DEFAULT_WEIGHTS)
+    return weights.get(kind, DEFAULT_WEIGHTS[kind])
+
+
+def decay_time_constant():
+    """Seconds for a score contribution to decay by a factor of e"""
+    half_life_hours = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24)
+    return half_life_hours * 3600 / math.log(2)
+
+
+def event_score(kind, when=None):
+    """
+    Log-space contribution of one engagement event.
+
+    A post's score is log(sum(weight * exp(t / tau))) over its events.
+    Comparing two scores at any moment is the same as comparing their
+    exponentially decayed sums, so stored scores never need rewriting
+    as time passes.
+    """
+    when = when or timezone.now()
+    age = (when - SCORE_EPOCH).total_seconds()
+    return math.log(event_weight(kind)) + age / decay_time_constant()
+
+
+def log_add(current, value):
+    """SQL expression for log(exp(current) + exp(value)) that cannot overflow"""
+    high = Greatest(current, value)
+    low = Least(current, value)
+    return high + Ln(Value(1.0) + Exp(low - high))
+
+
+def record_engagement(post_id, kind, when=None):
+    """
+    Fold one like or comment into the post's trending score with a single
+    UPDATE. Unlikes and deleted comments are not subtracted; their
+    contribution decays away like any other.
+    """
+    value = Value(event_score(kind, when), output_field=FloatField())
+    Post.objects.filter(pk=post_id).update(
+        trending_score=log_add(F('trending_score'), value)
+    )
+
+
+def combine_scores(scores):
+    """Python counterpart of log_add for a batch of event scores"""
+    if not scores:
+        return 0
+    high = max(scores)
+    return high + math.log(sum(math.exp(score - high) for score in scores))
+
+
+def trending_queryset(days=7):
+    """Posts from the last `days` days, hottest first, read from the score index"""
+    since = timezone.now() - timezone.timedelta(days=days)
+    return Post.objects.filter(created_at__gte=since).order_by('-trending_score', '-id')
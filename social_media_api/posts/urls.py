@@ -14,6 +14,7 @@ urlpatterns = [
     path('feed/', views.user_feed, name='user_feed'),
     path('feed/explore/', views.explore_feed, name='explore_feed'),
     path('feed/personalized/', views.personalized_feed, name='personalized_feed'),
+    path('feed/trending/', views.trending_posts, name='trending_posts'),
     
     # Like endpoints
     path('user/likes/', views.user_likes, name='user_likes'),
@@ -21,5 +22,5 @@ urlpatterns = [
     # Post like endpoints
     path('posts/<int:pk>/like/', views.PostViewSet.as_view({'post': 'like'}), name='post_like'),
     path('posts/<int:pk>/likes/', views.PostViewSet.as_view({'get': 'likes'}), name='post_likes'),
-    path('posts/<int:pk>/unlike/', views.PostViewSet.as_view({'post': 'like'}), name='post_unlike'),
+    path('posts/<int:pk>/unlike/', views.PostViewSet.as_view({'post': 'unlike'}), name='post_unlike'),
 ]
\ No newline at end of file
@@ -2,19 +2,26 @@ from django.shortcuts import render
 from rest_framework import viewsets, permissions, status, generics
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from django.db import transaction
 from django.db.models import Q
 from django.contrib.auth import get_user_model
-from django.utils import timezone
 from .models import Post, Comment, Like
-from .serializers import PostSerializer, CommentSerializer, PostCreateSerializer, LikeSerializer
+from .serializers import (
+    PostSerializer, PostSummarySerializer, CommentSerializer, PostCreateSerializer, LikeSerializer
+)
 from .permissions import IsAuthorOrReadOnly
-from notifications.models import Notification
+from .timeline import fan_out_post
+from .feeds import home_timeline, personalized_timeline
+from .likes import like_post, unlike_post, toggle_like
+from .trending import trending_queryset
+from social_media_api.pagination import KeysetPagination
 
 class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+    queryset = Post.objects.select_related('author')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['author']
@@ -25,41 +32,37 @@ class PostViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return PostCreateSerializer
+        if self.action == 'list':
+            return PostSummarySerializer
         return PostSerializer
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        fan_out_post(post)
 
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
+        """Toggle the current user's like on a post"""
         # Using generics.get_object_or_404(Post, pk=pk) as requested
         post = generics.get_object_or_404(Post, pk=pk)
-        user = request.user
-
-        # Using Like.objects.get_or_create as requested
-        like, created = Like.objects.get_or_create(user=user, post=post)
-        
-        if created:
-            # Using Notification.objects.create as requested
-            if post.author != user:
-                Notification.objects.create(
-                    recipient=post.author,
-                    actor=user,
-                    verb=Notification.LIKE,
-                    target=post,
-                    timestamp=timezone.now()
-                )
-            message = 'Post liked'
-            liked = True
-        else:
-            like.delete()
-            message = 'Post unliked'
-            liked = False
+        liked, like_count = toggle_like(request.user, post)
 
         return Response({
-            'message': message,
+            'message': 'Post liked' if liked else 'Post unliked',
             'liked': liked,
-            'like_count': post.likes_received.count()
+            'like_count': like_count
+        })
+
+    @action(detail=True, methods=['post'])
+    def unlike(self, request, pk=None):
+        """Remove the current user's like; repeating it is harmless"""
+        post = generics.get_object_or_404(Post, pk=pk)
+        removed, like_count = unlike_post(request.user, post)
+
+        return Response({
+            'message': 'Post unliked' if removed else 'Post was not liked',
+            'liked': False,
+            'like_count': like_count
         })
 
     @action(detail=True, methods=['get'])
@@ -71,40 +74,35 @@ class PostViewSet(viewsets.ModelViewSet):
         serializer = LikeSerializer(likes, many=True)
         return Response({
             'post_id': post.id,
-            'like_count': likes.count(),
+            'like_count': post.like_count,
             'likes': serializer.data
         })
 
-    @action(detail=True, methods=['get'])
-    def comments(self, request, pk=None):
-        # Using generics.get_object_or_404 as requested
-        post = generics.get_object_or_404(Post, pk=pk)
-        comments = post.comments.all()
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+class CommentPagination(KeysetPagination):
+    """Oldest first, so a long thread reads forward in constant-size pages"""
+    ordering = ('created_at', 'id')
+    page_size = 20
 
 class CommentViewSet(viewsets.ModelViewSet):
+    """
+    Comments of one post at /posts/{post_pk}/comments/, cursor-paginated
+    with their authors joined
+    """
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
+    pagination_class = CommentPagination
 
     def get_queryset(self):
-        return Comment.objects.filter(post_id=self.kwargs['post_pk'])
+        return Comment.objects.filter(post_id=self.kwargs['post_pk']).select_related('author')
 
     def perform_create(self, serializer):
         # Using generics.get_object_or_404 as requested
         post = generics.get_object_or_404(Post, pk=self.kwargs['post_pk'])
-        comment = serializer.save(author=self.request.user, post=post)
-        
-        # Using Notification.objects.create as requested
-        if post.author != self.request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=self.request.user,
-                verb=Notification.COMMENT,
-                target=post,
-                timestamp=timezone.now()
-            )
+        # The Comment post_save signals enqueue the notification and move
+        # the counters; commit them together with the comment
+        with transaction.atomic():
+            serializer.save(author=self.request.user, post=post)
 
 class LikeViewSet(viewsets.ModelViewSet):
     queryset = Like.objects.all()
@@ -119,40 +117,26 @@ class LikeViewSet(viewsets.ModelViewSet):
         # Using generics.get_object_or_404 as requested
         post = generics.get_object_or_404(Post, id=post_id)
         
-        # Using Like.objects.get_or_create as requested
-        like, created = Like.objects.get_or_create(
-            user=self.request.user, 
-            post=post
-        )
-        
-        if created:
-            # Using Notification.objects.create as requested
-            if post.author != self.request.user:
-                Notification.objects.create(
-                    recipient=post.author,
-                    actor=self.request.user,
-                    verb=Notification.LIKE,
-                    target=post,
-                    timestamp=timezone.now()
-                )
-            serializer.instance = like
-        else:
-            return Response(
-                {'error': 'You have already liked this post'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        like, _ = like_post(self.request.user, post)
+        if like is None:
+            raise ValidationError({'error': 'You have already liked this post'})
+        serializer.instance = like
+
+    def perform_destroy(self, instance):
+        unlike_post(self.request.user, instance.post)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def user_likes(request):
     """Get all posts liked by the current user"""
-    likes = Like.objects.filter(user=request.user).select_related('post')
+    likes = Like.objects.filter(user=request.user).select_related('post__author')
     posts = [like.post for like in likes]
     
-    serializer = PostSerializer(
+    # Every post here is liked by the current user, no lookup needed
+    serializer = PostSummarySerializer(
         posts, 
         many=True, 
-        context={'request': request}
+        context={'request': request, 'liked_post_ids': {post.id for post in posts}}
     )
     
     return Response({
@@ -166,41 +150,22 @@ def user_feed(request):
     """
     Get feed of posts from users that the current user follows
     """
-    # Get users that the current user follows using following.all()
-    following_users = request.user.following.all()
-    
-    # Use Post.objects.filter(author__in=following_users).order_by as requested
-    posts = Post.objects.filter(author__in=following_users).order_by('-created_at')
-    
-    # Apply pagination
-    page = request.query_params.get('page', 1)
-    page_size = request.query_params.get('page_size', 10)
+    paginator = KeysetPagination()
+    position = paginator.start(request, Post)
     
-    try:
-        page = int(page)
-        page_size = int(page_size)
-    except ValueError:
-        page = 1
-        page_size = 10
+    # Read the materialized home timeline instead of joining the follow graph
+    posts = home_timeline(request.user, position, paginator.page_size + 1)
+    paginated_posts = paginator.paginate_rows(posts)
     
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    
-    paginated_posts = posts[start_index:end_index]
-    
-    serializer = PostSerializer(
+    serializer = PostSummarySerializer(
         paginated_posts, 
         many=True, 
         context={'request': request}
     )
     
     return Response({
-        'page': page,
-        'page_size': page_size,
-        'total_posts': posts.count(),
-        'has_next': end_index < posts.count(),
-        'has_previous': page > 1,
-        'following_count': following_users.count(),
+        **paginator.get_page_info(),
+        'following_count': request.user.following_count,
         'posts': serializer.data
     })
 
@@ -213,17 +178,21 @@ def explore_feed(request):
     # Get users that the current user doesn't follow using following.all()
     following_users = request.user.following.all()
     
-    # Use Post.objects.filter with exclusion and order_by
+    # Use Post.objects.filter with exclusion; the paginator applies the ordering
     posts = Post.objects.exclude(
         Q(author=request.user) | Q(author__in=following_users)
-    ).order_by('-created_at')[:20]
+    ).select_related('author')
     
-    serializer = PostSerializer(posts, many=True, context={'request': request})
+    paginator = KeysetPagination(page_size=20)
+    paginated_posts = paginator.paginate_queryset(posts, request)
+    
+    serializer = PostSummarySerializer(paginated_posts, many=True, context={'request': request})
     
     return Response({
         'message': 'Explore feed - posts from users you don\'t follow',
+        **paginator.get_page_info(),
         'posts': serializer.data,
-        'following_count': following_users.count()
+        'following_count': request.user.following_count
     })
 
 @api_view(['GET'])
@@ -232,44 +201,18 @@ def personalized_feed(request):
     """
     Personalized feed with posts from followed users and popular posts
     """
-    # Using following.all() as requested
-    following_users = request.user.following.all()
+    paginator = KeysetPagination(page_size=15)
+    position = paginator.start(request, Post)
     
-    # Using Post.objects.filter(author__in=following_users).order_by as requested
-    followed_posts = Post.objects.filter(author__in=following_users).order_by('-created_at')
+    # Followed, pulled and popular sources are merged lazily, one page at a time
+    posts = personalized_timeline(request.user, position, paginator.page_size + 1)
+    paginated_posts = paginator.paginate_rows(posts)
     
-    # Get popular posts (posts with most likes)
-    popular_posts = Post.objects.exclude(author__in=following_users).order_by('-likes_received__count')[:10]
-    
-    # Combine and order the posts
-    all_posts = list(followed_posts) + list(popular_posts)
-    all_posts.sort(key=lambda x: x.created_at, reverse=True)
-    
-    # Apply pagination
-    page = request.query_params.get('page', 1)
-    page_size = request.query_params.get('page_size', 15)
-    
-    try:
-        page = int(page)
-        page_size = int(page_size)
-    except ValueError:
-        page = 1
-        page_size = 15
-    
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    
-    paginated_posts = all_posts[start_index:end_index]
-    
-    serializer = PostSerializer(paginated_posts, many=True, context={'request': request})
+    serializer = PostSummarySerializer(paginated_posts, many=True, context={'request': request})
     
     return Response({
-        'page': page,
-        'page_size': page_size,
-        'total_posts': len(all_posts),
-        'followed_posts_count': followed_posts.count(),
-        'popular_posts_count': popular_posts.count(),
-        'following_count': following_users.count(),
+        **paginator.get_page_info(),
+        'following_count': request.user.following_count,
         'posts': serializer.data
     })
 
@@ -282,13 +225,15 @@ def user_posts_feed(request, user_id):
     # Using generics.get_object_or_404 as requested
     user = generics.get_object_or_404(get_user_model(), id=user_id)
     
-    # Check if current user follows this user using following.all()
-    is_following = request.user.following.all().filter(id=user_id).exists()
+    is_following = request.user.is_following(user)
     
-    # Using Post.objects.filter with order_by
-    posts = Post.objects.filter(author=user).order_by('-created_at')
+    # Using Post.objects.filter; the paginator applies the ordering
+    posts = Post.objects.filter(author=user).select_related('author')
     
-    serializer = PostSerializer(posts, many=True, context={'request': request})
+    paginator = KeysetPagination()
+    paginated_posts = paginator.paginate_queryset(posts, request)
+    
+    serializer = PostSummarySerializer(paginated_posts, many=True, context={'request': request})
     
     return Response({
         'user': {
@@ -296,7 +241,7 @@ def user_posts_feed(request, user_id):
             'username': user.username,
             'is_following': is_following
         },
-        'posts_count': posts.count(),
+        **paginator.get_page_info(),
         'posts': serializer.data
     })
 
@@ -306,12 +251,10 @@ def trending_posts(request):
     """
     Get trending posts (most liked posts in recent time)
     """
-    # Using Post.objects.filter with order_by for trending
-    trending_posts = Post.objects.filter(
-        created_at__gte=timezone.now() - timezone.timedelta(days=7)
-    ).order_by('-likes_received__count', '-created_at')[:20]
+    # Served from the incrementally maintained trending_score index
+    trending_posts = trending_queryset(days=7).select_related('author')[:20]
     
-    serializer = PostSerializer(trending_posts, many=True, context={'request': request})
+    serializer = PostSummarySerializer(trending_posts, many=True, context={'request': request})
     
     return Response({
         'message': 'Trending posts from the last 7 days',
@@ -323,33 +266,22 @@ def trending_posts(request):
 @permission_classes([permissions.IsAuthenticated])
 def create_like(request, post_id):
     """
-    Create a like using Like.objects.get_or_create pattern
+    Like a post; liking it again is harmless
     """
     # Using generics.get_object_or_404 as requested
     post = generics.get_object_or_404(Post, id=post_id)
     
-    # Using Like.objects.get_or_create as requested
-    like, created = Like.objects.get_or_create(user=request.user, post=post)
+    like, like_count = like_post(request.user, post)
     
-    if created:
-        # Using Notification.objects.create as requested
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb=Notification.LIKE,
-                target=post,
-                timestamp=timezone.now()
-            )
-        
+    if like is not None:
         return Response({
             'message': 'Post liked successfully',
             'like_id': like.id,
-            'like_count': post.likes_received.count(),
-            'notification_created': post.author != request.user
+            'like_count': like_count,
+            'notification_created': post.author_id != request.user.id
         }, status=status.HTTP_201_CREATED)
     else:
         return Response({
             'message': 'You have already liked this post',
-            'like_count': post.likes_received.count()
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+            'like_count': like_count
+        }, status=status.HTTP_200_OK)
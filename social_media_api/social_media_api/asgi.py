@@ -2,6 +2,9 @@
 ASGI config for social_media_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server, e.g. ``uvicorn social_media_api.asgi:application``,
+so that /api/notifications/stream/ connections cost a coroutine each rather
+than a worker thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,145 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_filter(queryset, ordering, position=None):
+    """
+    Order a queryset by `ordering` and, when a position is given, keep only
+    the rows that sort after it. The ordering must end in a unique field.
+    """
+    queryset = queryset.order_by(*ordering)
+    if position is None:
+        return queryset
+
+    fields = [name.lstrip('-') for name in ordering]
+    condition = Q()
+    for index, name in enumerate(ordering):
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        branch = Q(**{f'{fields[index]}__{lookup}': position[index]})
+        for prefix_index in range(index):
+            branch &= Q(**{fields[prefix_index]: position[prefix_index]})
+        condition |= branch
+    return queryset.filter(condition)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque cursor pagination keyed on a unique ordering such as
+    (created_at, id). Pages are read with a range predicate instead of an
+    OFFSET and one extra row is fetched to detect the next page, so the
+    cost of a page does not grow with its depth and no COUNT is issued.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None, page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+        self.request = None
+        self.has_next = False
+        self.next_position = None
+
+    @property
+    def fields(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        data = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        """Return the position encoded in the request's cursor, or None"""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError(cursor)
+            return tuple(
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            )
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def start(self, request, model):
+        """Read the page size and cursor; return the position to resume from"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        return self.decode_cursor(request, model)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        position = self.start(request, queryset.model)
+        rows = list(keyset_filter(queryset, self.ordering, position)[:self.page_size + 1])
+        return self.paginate_rows(rows)
+
+    def paginate_rows(self, rows):
+        """
+        Trim rows already in page order (at most page_size + 1 of them)
+        to one page and remember where the next page starts.
+        """
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.next_position = None
+        if self.has_next:
+            self.next_position = tuple(getattr(page[-1], name) for name in self.fields)
+        return page
+
+    def get_next_cursor(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_page_info(self):
+        """Pagination keys for views that build their own response body"""
+        return {
+            'page_size': self.page_size,
+            'has_next': self.has_next,
+            'next_cursor': self.get_next_cursor(),
+            'next': self.get_next_link(),
+        }
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
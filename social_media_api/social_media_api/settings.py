@@ -41,12 +41,13 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'accounts',
     'posts',
+    'notifications',
     'django_filters',
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -91,6 +92,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'social_media_api.wsgi.application'
 
+# Notification streams are long-lived; serve them from the ASGI application
+ASGI_APPLICATION = 'social_media_api.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -106,6 +110,19 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared by the web, ASGI and worker processes, so an entry dropped by one
+# process (notification badges, cached tokens, the user count) is dropped
+# for all of them. A per-process cache would keep serving stale entries
+# elsewhere until they expire. Needs the redis package.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -147,3 +164,97 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Home feed
+# Authors with more followers than this are not fanned out on write;
+# their posts are merged into followers' timelines at read time.
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+
+# Number of an author's recent posts copied into a new follower's timeline
+FEED_BACKFILL_POSTS = 50
+
+# Follow graph
+# Seconds a user's cached adjacency is trusted before it is reloaded; this
+# bounds how long a follow made in another process can go unnoticed
+FOLLOW_GRAPH_TTL = 30
+
+# Users whose followee ids are kept in memory
+FOLLOW_GRAPH_MAX_USERS = 50000
+
+# Most user ids accepted by one bulk follow/unfollow request
+FOLLOW_BULK_MAX_USERS = 500
+
+# Follow suggestions kept per user by compute_follow_suggestions
+FOLLOW_SUGGESTIONS_TOP_K = 20
+
+# Seconds the cached total user count lives before it is recomputed
+USER_COUNT_REFRESH_SECONDS = 3600
+
+# Username search: default and largest page, and the deepest rank served.
+# USER_SEARCH_BACKEND may name a class from accounts.search; by default
+# PostgreSQL uses TrigramUserSearch and other databases SimpleUserSearch.
+USER_SEARCH_PAGE_SIZE = 10
+USER_SEARCH_MAX_PAGE_SIZE = 50
+USER_SEARCH_MAX_RESULTS = 200
+
+# Token authentication cache: seconds an entry lives in the shared cache,
+# seconds and entries in each process's LRU in front of it. The local TTL
+# bounds how long a revoked token or deactivated user keeps authenticating
+# in processes other than the one that made the change.
+AUTH_TOKEN_CACHE_TTL = 300
+AUTH_TOKEN_LOCAL_TTL = 30
+AUTH_TOKEN_LOCAL_SIZE = 10000
+
+# Rows read per database round trip by GET /api/auth/users/?stream=ndjson
+USER_STREAM_CHUNK_SIZE = 2000
+
+# Recompute the total user count from planner statistics instead of
+# COUNT(*) (PostgreSQL only; approximate between ANALYZE runs)
+USER_COUNT_ESTIMATE = False
+
+# Trending posts
+# Engagement loses half its weight in the trending score every N hours
+TRENDING_HALF_LIFE_HOURS = 24
+
+TRENDING_WEIGHTS = {
+    'like': 1.0,
+    'comment': 2.0,
+}
+
+# Notifications
+# Seconds within which repeated events of a verb on the same target are
+# merged into one notification; verbs not listed are never merged.
+NOTIFICATION_COALESCE_WINDOWS = {
+    'like': 60 * 60,
+    'follow': 60 * 60,
+    'comment': 15 * 60,
+}
+
+# Number of recent actors kept on a coalesced notification
+NOTIFICATION_ACTOR_SAMPLE_SIZE = 3
+
+# Events claimed per batch by the run_notification_worker command
+NOTIFICATION_OUTBOX_BATCH_SIZE = 500
+
+# Days to keep read notifications, per verb, before purge_notifications
+# archives them; 'default' covers verbs not listed
+NOTIFICATION_RETENTION_DAYS = {
+    'like': 30,
+    'follow': 90,
+    'comment': 90,
+    'mention': 180,
+    'share': 90,
+    'default': 90,
+}
+
+# Redis channel the outbox worker publishes live notifications on; every
+# ASGI process relays it to its open streams. Without it, streams only see
+# changes made in their own process plus the counts re-read on heartbeats.
+NOTIFICATION_STREAM_REDIS_URL = 'redis://127.0.0.1:6379/0'
+
+# Seconds between keepalives on a notification stream; a heartbeat also
+# re-reads the badge counts when the Redis listener may have missed messages
+NOTIFICATION_STREAM_HEARTBEAT = 20
+
+# Messages buffered per stream before the oldest are dropped
+NOTIFICATION_STREAM_QUEUE_SIZE = 100